@@ -5,11 +5,21 @@ Flask Web UI for Headline AI Generator
 
 import os
 import json
-from flask import Flask, render_template, request, jsonify, send_from_directory
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from flask import Flask, Response, render_template, request, jsonify, send_from_directory, send_file, redirect
 from werkzeug.utils import secure_filename
 from datetime import datetime
 import config
 from headline_generator import HeadlineGenerator
+from jobs import JobManager, JobQueueFull
+from encoders import mimetype, normalize_format
+from metrics import Trace, registry
+from options import Options
+from post_index import get_post_index
+from thumbnails import create_thumbnail, remove_thumbnail, thumbnail_path
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.urandom(24)
@@ -18,6 +28,40 @@ app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max
 # Store settings in a JSON file
 SETTINGS_FILE = 'web_settings.json'
 
+# Background generation jobs
+job_manager = JobManager()
+
+# Saves posts rendered by /api/render with "persist": true, off the request path
+persist_pool = ThreadPoolExecutor(1, thread_name_prefix='persist')
+
+# Shared generator (API client, HTTP pool, caches), rebuilt when the API key changes
+_generator = None
+_generator_key = None
+_generator_lock = threading.Lock()
+
+# Settings snapshot for new jobs, replaced (never modified) when settings are saved
+_options = Options.from_config()
+
+
+def get_generator():
+    """Return the warm shared HeadlineGenerator, thread-safe
+
+    A new instance is built only when the API key changed. Jobs still running
+    on a replaced instance finish with it, it is then garbage collected.
+    """
+    global _generator, _generator_key
+    key = os.getenv('GEMINI_API_KEY')
+    with _generator_lock:
+        if _generator is None or _generator_key != key:
+            _generator = HeadlineGenerator(options=_options)
+            _generator_key = key
+        return _generator
+
+
+def current_options():
+    """Settings for jobs submitted now, running jobs keep the snapshot they started with"""
+    return _options
+
 
 def load_settings():
     """Load settings from JSON file"""
@@ -44,70 +88,83 @@ def index():
 def settings_page():
     """Advanced settings page"""
     # Get all config values
+    options = current_options()
     config_values = {
-        'IMAGE_WIDTH': config.IMAGE_WIDTH,
-        'IMAGE_HEIGHT': config.IMAGE_HEIGHT,
-        'TITLE_FONT_SIZE': config.TITLE_FONT_SIZE,
-        'SOURCE_FONT_SIZE': config.SOURCE_FONT_SIZE,
-        'BOX_MARGIN': config.BOX_MARGIN,
-        'BOX_PADDING': config.BOX_PADDING,
-        'BOX_RADIUS': config.BOX_RADIUS,
-        'LINE_HEIGHT': config.LINE_HEIGHT,
-        'MAX_TITLE_LENGTH': config.MAX_TITLE_LENGTH,
-        'GEMINI_MODEL': config.GEMINI_MODEL,
-        'GEMINI_TEMPERATURE': config.GEMINI_TEMPERATURE,
-        'MIN_IMAGE_WIDTH': config.MIN_IMAGE_WIDTH,
-        'MIN_IMAGE_HEIGHT': config.MIN_IMAGE_HEIGHT,
-        'MAX_IMAGE_CANDIDATES': config.MAX_IMAGE_CANDIDATES,
-        'AI_PROMPT_TEMPLATE': config.AI_PROMPT_TEMPLATE,
-        'HEADLINE_STYLES': config.HEADLINE_STYLES,
-        'DEFAULT_HEADLINE_STYLE': config.DEFAULT_HEADLINE_STYLE,
-        'SHOW_SOURCE': config.SHOW_SOURCE,
-        'SOURCE_TEXT': config.SOURCE_TEXT,
+        'IMAGE_WIDTH': options.IMAGE_WIDTH,
+        'IMAGE_HEIGHT': options.IMAGE_HEIGHT,
+        'TITLE_FONT_SIZE': options.TITLE_FONT_SIZE,
+        'SOURCE_FONT_SIZE': options.SOURCE_FONT_SIZE,
+        'BOX_MARGIN': options.BOX_MARGIN,
+        'BOX_PADDING': options.BOX_PADDING,
+        'BOX_RADIUS': options.BOX_RADIUS,
+        'LINE_HEIGHT': options.LINE_HEIGHT,
+        'MAX_TITLE_LENGTH': options.MAX_TITLE_LENGTH,
+        'GEMINI_MODEL': options.GEMINI_MODEL,
+        'GEMINI_TEMPERATURE': options.GEMINI_TEMPERATURE,
+        'MIN_IMAGE_WIDTH': options.MIN_IMAGE_WIDTH,
+        'MIN_IMAGE_HEIGHT': options.MIN_IMAGE_HEIGHT,
+        'MAX_IMAGE_CANDIDATES': options.MAX_IMAGE_CANDIDATES,
+        'AI_PROMPT_TEMPLATE': options.AI_PROMPT_TEMPLATE,
+        'HEADLINE_STYLES': options.HEADLINE_STYLES,
+        'DEFAULT_HEADLINE_STYLE': options.DEFAULT_HEADLINE_STYLE,
+        'SHOW_SOURCE': options.SHOW_SOURCE,
+        'SOURCE_TEXT': options.SOURCE_TEXT,
     }
 
     settings = load_settings()
     return render_template('settings.html', config=config_values, settings=settings)
 
 
+def thumbnail_url(filename, row=None):
+    """Cacheable thumbnail URL when the thumbnail exists, otherwise the lazy /thumb route"""
+    if row and row.get('thumbnail') and os.path.exists(thumbnail_path(row['thumbnail'])):
+        return f"/thumbs/{row['thumbnail']}"
+    return f"/thumb/{filename}"
+
+
 @app.route('/gallery')
 def gallery():
-    """Gallery of generated posts"""
-    output_dir = config.OUTPUT_DIR
+    """Gallery of generated posts, paginated from the post index"""
+    index = get_post_index()
+    index.backfill(config.OUTPUT_DIR)
+
+    filters = {
+        'style': request.args.get('style', '').strip(),
+        'layout': request.args.get('layout', '').strip(),
+        'q': request.args.get('q', '').strip(),
+    }
+    rows, next_cursor = index.page(
+        cursor=request.args.get('cursor'),
+        style=filters['style'] or None,
+        layout=filters['layout'] or None,
+        query=filters['q'] or None
+    )
+
+    # Build posts list
+    now = time.time()
     posts = []
-
-    if os.path.exists(output_dir):
-        # Get all PNG files with their modification times
-        files_with_mtime = []
-        for filename in os.listdir(output_dir):
-            if filename.endswith('.png'):
-                filepath = os.path.join(output_dir, filename)
-                stat = os.stat(filepath)
-                files_with_mtime.append({
-                    'filename': filename,
-                    'filepath': filepath,
-                    'mtime': stat.st_mtime,
-                    'size': stat.st_size
-                })
-
-        # Sort by modification time (newest first)
-        files_with_mtime.sort(key=lambda x: x['mtime'], reverse=True)
-
-        # Build posts list
-        import time
-        now = time.time()
-        for file_data in files_with_mtime:
+    for row in rows:
+        posts.append({
+            'filename': row['filename'],
+            'thumbnail_url': thumbnail_url(row['filename'], row),
+            'title': row['title'],
+            'style': row['style'],
+            'layout': row['layout'],
+            'created': datetime.fromtimestamp(row['updated']).strftime('%Y-%m-%d %H:%M'),
+            'size': f"{row['size'] / 1024:.1f} KB",
             # Check if created within last 24 hours
-            is_new = (now - file_data['mtime']) < 86400  # 24 hours in seconds
-
-            posts.append({
-                'filename': file_data['filename'],
-                'created': datetime.fromtimestamp(file_data['mtime']).strftime('%Y-%m-%d %H:%M'),
-                'size': f"{file_data['size'] / 1024:.1f} KB",
-                'is_new': is_new
-            })
+            'is_new': (now - row['updated']) < 86400
+        })
 
-    return render_template('gallery.html', posts=posts)
+    return render_template(
+        'gallery.html',
+        posts=posts,
+        filters=filters,
+        next_cursor=next_cursor,
+        is_first_page=not request.args.get('cursor'),
+        styles=config.HEADLINE_STYLES,
+        layouts=config.AVAILABLE_LAYOUTS
+    )
 
 
 @app.route('/api/save-api-key', methods=['POST'])
@@ -143,6 +200,9 @@ def save_api_key():
     with open(env_file, 'w') as f:
         f.writelines(env_content)
 
+    # Apply to the running process, the shared generator picks up the new key
+    os.environ['GEMINI_API_KEY'] = api_key
+
     # Update settings
     settings = load_settings()
     settings['api_key_set'] = True
@@ -217,57 +277,209 @@ def save_advanced_settings():
     with open('config.py', 'w') as f:
         f.write(config_content)
 
-    # Reload config module
-    import importlib
-    importlib.reload(config)
+    # New jobs use the saved file, the config module itself is left untouched
+    global _options
+    _options = Options.from_file('config.py')
 
     return jsonify({'success': True})
 
 
-@app.route('/api/generate', methods=['POST'])
-def generate_post():
-    """Generate post from URL"""
-    data = request.get_json()
+def read_generate_request(data):
+    """Validate url/brand_text/style/layout/format of a generate request
+
+    Returns:
+        (params, error) with error None when the request is valid
+    """
     url = data.get('url', '').strip()
     brand_text = data.get('brand_text', '').strip()
     style = data.get('style', 'clickbait')
     layout = data.get('layout', 'layout1')
+    output_format = data.get('format') or None
+
+    # Settings snapshot taken now, saving settings later doesn't affect this job
+    options = current_options()
 
     if not url:
-        return jsonify({'success': False, 'error': 'URL is required'})
+        return None, 'URL is required'
 
     # Validate style
-    if style not in config.HEADLINE_STYLES:
-        return jsonify({'success': False, 'error': f'Invalid style: {style}'})
+    if style not in options.HEADLINE_STYLES:
+        return None, f'Invalid style: {style}'
 
     # Validate layout
-    if layout not in config.AVAILABLE_LAYOUTS:
-        return jsonify({'success': False, 'error': f'Invalid layout: {layout}'})
+    if layout not in options.AVAILABLE_LAYOUTS:
+        return None, f'Invalid layout: {layout}'
+
+    # Validate output format
+    if output_format:
+        try:
+            output_format = normalize_format(output_format, options)
+        except ValueError as e:
+            return None, str(e)
 
     # Check if API key is set
     if not os.getenv('GEMINI_API_KEY'):
-        return jsonify({'success': False, 'error': 'API key not set. Please set it in settings.'})
+        return None, 'API key not set. Please set it in settings.'
 
-    try:
-        generator = HeadlineGenerator()
-        output_path = generator.generate_post(
+    return {
+        'url': url,
+        'brand_text': brand_text or None,
+        'style': style,
+        'layout': layout,
+        'output_format': output_format,
+        'options': options,
+    }, None
+
+
+@app.route('/api/generate', methods=['POST'])
+def generate_post():
+    """Queue post generation from URL
+
+    Returns a job id right away, poll /api/jobs/<job_id> for progress.
+    Send "wait": true to block until the post is ready instead.
+    """
+    data = request.get_json()
+    params, error = read_generate_request(data)
+    if error:
+        return jsonify({'success': False, 'error': error})
+
+    url = params['url']
+    style = params['style']
+    layout = params['layout']
+    output_format = params['output_format']
+
+    def run(progress):
+        trace = Trace()
+        output_path = get_generator().generate_post(
             url,
-            brand_text=brand_text or None,
+            brand_text=params['brand_text'],
             style=style,
-            layout=layout
+            layout=layout,
+            progress=progress,
+            output_format=output_format,
+            options=params['options'],
+            trace=trace
         )
 
         # Get filename
         filename = os.path.basename(output_path)
-
-        return jsonify({
-            'success': True,
+        return {
             'filename': filename,
-            'url': f'/output/{filename}'
-        })
+            'url': f'/output/{filename}',
+            'thumbnail_url': thumbnail_url(filename, get_post_index().get(filename)),
+            'metrics': trace.to_dict()
+        }
 
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)})
+    try:
+        job = job_manager.submit(run, url=url, style=style, layout=layout, format=output_format)
+    except JobQueueFull as e:
+        response = jsonify({'success': False, 'error': f'Server busy: {e}'})
+        response.headers['Retry-After'] = '5'
+        return response, 429
+
+    if data.get('wait'):
+        job.wait()
+        if job.status == 'failed':
+            return jsonify({'success': False, 'error': job.error})
+        return jsonify({'success': True, 'job_id': job.id, **job.result})
+
+    return jsonify({
+        'success': True,
+        'job_id': job.id,
+        'status_url': f'/api/jobs/{job.id}'
+    }), 202
+
+
+@app.route('/api/render', methods=['POST'])
+def render_post_image():
+    """Generate a post and return the encoded image in the response body
+
+    Runs as a job like /api/generate, so it counts against JOB_MAX_PENDING and
+    answers 429 when the queue is full. Nothing is written to OUTPUT_DIR unless
+    "persist": true is sent, the post is then saved and indexed in the
+    background after the response is built.
+    """
+    data = request.get_json()
+    params, error = read_generate_request(data)
+    if error:
+        return jsonify({'success': False, 'error': error})
+
+    generator = get_generator()
+    trace = Trace()
+    rendered = {}
+
+    def run(progress):
+        image_data, output_format, article_data = generator.generate_post_bytes(
+            params['url'],
+            brand_text=params['brand_text'],
+            style=params['style'],
+            layout=params['layout'],
+            progress=progress,
+            output_format=params['output_format'],
+            options=params['options'],
+            trace=trace
+        )
+        # The encoded image stays out of the job result, which is served as JSON
+        rendered.update(image_data=image_data, article_data=article_data)
+        return {'title': article_data.get('title'), 'format': output_format, 'metrics': trace.to_dict()}
+
+    try:
+        job = job_manager.submit(run, url=params['url'], style=params['style'], layout=params['layout'],
+                                 format=params['output_format'])
+    except JobQueueFull as e:
+        response = jsonify({'success': False, 'error': f'Server busy: {e}'})
+        response.headers['Retry-After'] = '5'
+        return response, 429
+
+    job.wait()
+    if job.status == 'failed':
+        return jsonify({'success': False, 'error': job.error})
+    image_data = rendered['image_data']
+    article_data = rendered['article_data']
+    output_format = job.result['format']
+
+    filename = os.path.basename(generator.build_output_path(
+        article_data['title'], output_format=output_format, options=params['options']
+    ))
+    response = send_file(BytesIO(image_data), mimetype=mimetype(output_format), download_name=filename)
+    response.headers['Server-Timing'] = trace.server_timing()
+
+    if data.get('persist'):
+        persist_pool.submit(
+            generator.save_post_bytes,
+            image_data,
+            params['url'],
+            article_data,
+            style=params['style'],
+            layout=params['layout'],
+            output_format=output_format
+        )
+        response.headers['X-Post-Url'] = f'/output/{filename}'
+
+    return response
+
+
+@app.route('/api/jobs/<job_id>')
+def job_status(job_id):
+    """Status, per-stage progress and result of a generation job"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    return jsonify({'success': True, **job.to_dict()})
+
+
+@app.route('/api/jobs')
+def jobs_overview():
+    """Worker pool and queue depth"""
+    return jsonify({'success': True, **job_manager.stats()})
+
+
+@app.route('/metrics')
+def metrics():
+    """Stage timings, counters and job queue depth in Prometheus text format"""
+    stats = job_manager.stats()
+    body = registry.render(gauges={'jobs_running': stats['running'], 'jobs_queued': stats['queued']})
+    return Response(body, mimetype='text/plain; version=0.0.4')
 
 
 @app.route('/output/<filename>')
@@ -276,13 +488,51 @@ def serve_output(filename):
     return send_from_directory(config.OUTPUT_DIR, filename)
 
 
+@app.route('/thumb/<filename>')
+def serve_post_thumbnail(filename):
+    """Create a missing thumbnail and redirect to its content-hash URL"""
+    filename = secure_filename(filename)
+    filepath = os.path.join(config.OUTPUT_DIR, filename)
+    if not os.path.exists(filepath):
+        return jsonify({'success': False, 'error': 'File not found'}), 404
+
+    index = get_post_index()
+    row = index.get(filename)
+    if row and row['thumbnail'] and os.path.exists(thumbnail_path(row['thumbnail'])):
+        name = row['thumbnail']
+    else:
+        name = create_thumbnail(filepath)
+        if row:
+            index.set_thumbnail(filename, name)
+
+    # The redirect target changes when the post is regenerated, don't cache the redirect
+    response = redirect(f'/thumbs/{name}')
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+@app.route('/thumbs/<name>')
+def serve_thumbnail(name):
+    """Serve content-hash thumbnails, cacheable forever"""
+    response = send_from_directory(config.THUMBNAIL_DIR, name, max_age=config.THUMBNAIL_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
 @app.route('/api/delete/<filename>', methods=['DELETE'])
 def delete_post(filename):
     """Delete a generated post"""
     try:
-        filepath = os.path.join(config.OUTPUT_DIR, secure_filename(filename))
+        filename = secure_filename(filename)
+        filepath = os.path.join(config.OUTPUT_DIR, filename)
         if os.path.exists(filepath):
             os.remove(filepath)
+            index = get_post_index()
+            row = index.get(filename)
+            if row:
+                remove_thumbnail(row['thumbnail'])
+            index.remove(filename)
             return jsonify({'success': True})
         return jsonify({'success': False, 'error': 'File not found'})
     except Exception as e:
@@ -293,6 +543,10 @@ if __name__ == '__main__':
     # Create output directory
     os.makedirs(config.OUTPUT_DIR, exist_ok=True)
 
+    # Warm up generator (API client, fonts, layout assets) before the first request
+    if os.getenv('GEMINI_API_KEY'):
+        get_generator()
+
     # Run app
     print("\n" + "="*60)
     print("Headline AI - Web Interface")
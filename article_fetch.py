@@ -0,0 +1,143 @@
+"""
+Headline AI - Streaming article download
+
+Article pages are read in chunks instead of through response.text: the body
+is capped at ARTICLE_MAX_BYTES, reading stops at </body> so trailing data
+after the document is never downloaded, and the bytes are decoded with the
+charset the server or the page declares instead of running charset detection
+over the whole body.
+
+ArticleCache keeps fetched pages on disk with their ETag/Last-Modified, so a
+page fetched again is served from disk within ARTICLE_CACHE_FRESH seconds and
+revalidated with a conditional GET after that.
+"""
+
+import codecs
+import json
+import re
+
+import config
+from cache import DiskCache, make_key
+
+# End of the document body. Stopping at an earlier </article> is not safe: teaser
+# <article>s in navigation or trending blocks often come before the story itself.
+BODY_END = re.compile(rb'</body\s*>', re.IGNORECASE)
+
+HEADER_CHARSET = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+# <meta charset="..."> and <meta http-equiv="Content-Type" content="text/html; charset=...">
+META_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+
+# Bytes searched for a <meta charset>, pages put it early in <head>
+META_CHARSET_SCAN_BYTES = 8192
+
+# Longest marker that can be split across two chunks
+MARKER_OVERLAP = 16
+
+
+def _body_end(data, start):
+    """Offset just after </body> at or after start, None if not arrived yet"""
+    match = BODY_END.search(data, start)
+    return match.end() if match is not None else None
+
+
+def read_article(response, options=None):
+    """Read a streamed article response, returns the body bytes
+
+    Reading stops at ARTICLE_MAX_BYTES, and with ARTICLE_EARLY_CUTOFF as soon
+    as </body> has been received.
+
+    Args:
+        response: requests response opened with stream=True
+        options: Options for this job (default: config)
+    """
+    options = options or config
+    max_bytes = options.ARTICLE_MAX_BYTES
+    data = bytearray()
+    scanned = 0
+
+    for chunk in response.iter_content(options.ARTICLE_CHUNK_SIZE):
+        data.extend(chunk)
+
+        if options.ARTICLE_EARLY_CUTOFF:
+            end = _body_end(data, max(0, scanned - MARKER_OVERLAP))
+            if end is not None:
+                print(f"Page complete after {end} bytes, stopped reading")
+                del data[end:]
+                break
+            scanned = len(data)
+
+        if max_bytes and len(data) >= max_bytes:
+            print(f"Warning: article larger than {max_bytes} bytes, truncated")
+            del data[max_bytes:]
+            break
+
+    return bytes(data)
+
+
+def declared_charset(content_type, data):
+    """Charset from the Content-Type header, else from a <meta> tag, None if not declared"""
+    candidates = []
+    match = HEADER_CHARSET.search(content_type or '')
+    if match:
+        candidates.append(match.group(1))
+    match = META_CHARSET.search(data, 0, META_CHARSET_SCAN_BYTES)
+    if match:
+        candidates.append(match.group(1).decode('ascii'))
+
+    for charset in candidates:
+        try:
+            return codecs.lookup(charset).name
+        except LookupError:
+            continue
+    return None
+
+
+def decode_article(data, content_type=None):
+    """Decode article bytes with the declared charset, UTF-8 when none is declared"""
+    if data.startswith(codecs.BOM_UTF8):
+        return data[len(codecs.BOM_UTF8):].decode('utf-8', errors='replace')
+    charset = declared_charset(content_type, data) or 'utf-8'
+    return data.decode(charset, errors='replace')
+
+
+class ArticleCache:
+    def __init__(self, path, ttl=None, max_bytes=None):
+        """Article HTML by URL, with the validators needed for conditional GETs
+
+        Args:
+            path: SQLite database file
+            ttl: Seconds an entry is kept for revalidation (None = until evicted)
+            max_bytes: Disk budget, least recently used pages evicted first
+        """
+        self.disk = DiskCache(path, ttl=ttl, max_bytes=max_bytes)
+
+    def _key(self, url):
+        return make_key('article', url)
+
+    def get(self, url, max_age=None):
+        """Cached entry {html, etag, last_modified}, None if missing or older than max_age"""
+        raw = self.disk.get(self._key(url), max_age=max_age)
+        return json.loads(raw) if raw is not None else None
+
+    def put(self, url, html, etag=None, last_modified=None):
+        entry = {'html': html, 'etag': etag, 'last_modified': last_modified}
+        self.disk.put(self._key(url), json.dumps(entry, ensure_ascii=False))
+
+    def touch(self, url):
+        """Mark an entry fresh again after the server answered 304 Not Modified"""
+        self.disk.touch(self._key(url))
+
+    def conditional_headers(self, entry):
+        """If-None-Match/If-Modified-Since headers for revalidating entry"""
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def stats(self):
+        return self.disk.stats()
+
+    def close(self):
+        self.disk.close()
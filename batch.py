@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Headline AI - Batch mode for generating posts from many articles
+
+Each article goes through a pipeline of stages, each stage running on its own
+worker pool so network waits overlap instead of adding up:
+
+    fetch (I/O pool) -> Gemini (LLM pool) -> image download (I/O pool) -> render (CPU pool)
+
+With LLM_BATCH_SIZE > 1, the Gemini stage hands articles to an LLMBatcher that
+sends several articles per request (see llm_batcher.py).
+"""
+
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future
+from contextlib import ExitStack
+
+import config
+from fonts import font_registry
+from llm_batcher import LLMBatcher
+from metrics import Trace, registry
+
+
+def read_urls(source):
+    """Read article URLs from a file path, or stdin when source is "-"
+
+    Blank lines and lines starting with "#" are ignored.
+    """
+    if source == '-':
+        lines = sys.stdin.readlines()
+    else:
+        with open(source, 'r') as f:
+            lines = f.readlines()
+
+    urls = []
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            urls.append(line)
+    return urls
+
+
+class BatchGenerator:
+    def __init__(self, generator, io_workers=None, llm_workers=None, render_workers=None, llm_batch_size=None):
+        """Create a batch pipeline on top of an existing HeadlineGenerator
+
+        Args:
+            generator: HeadlineGenerator instance used for every stage
+            io_workers: Workers for article fetch and image download
+            llm_workers: Max concurrent Gemini calls
+            render_workers: Workers for post rendering
+            llm_batch_size: Articles per Gemini call (default: LLM_BATCH_SIZE, 1 = no batching)
+        """
+        self.generator = generator
+        self.io_workers = io_workers or config.BATCH_IO_WORKERS
+        self.llm_workers = llm_workers or config.BATCH_LLM_WORKERS
+        self.render_workers = render_workers or config.BATCH_RENDER_WORKERS
+        self.llm_batch_size = llm_batch_size or config.LLM_BATCH_SIZE
+
+    def _chain(self, future, pool, fn):
+        """When future completes, run fn(result) on pool
+
+        Errors skip the remaining stages and propagate to the returned future.
+        """
+        next_future = Future()
+
+        def run_stage(value):
+            try:
+                next_future.set_result(fn(value))
+            except Exception as e:
+                next_future.set_exception(e)
+
+        def on_done(done):
+            error = done.exception()
+            if error is not None:
+                next_future.set_exception(error)
+            else:
+                pool.submit(run_stage, done.result())
+
+        future.add_done_callback(on_done)
+        return next_future
+
+    def _then(self, future, fn):
+        """When future completes, call fn(result) which returns another future, and follow that one"""
+        next_future = Future()
+
+        def forward(done):
+            error = done.exception()
+            if error is not None:
+                next_future.set_exception(error)
+            else:
+                next_future.set_result(done.result())
+
+        def on_done(done):
+            error = done.exception()
+            if error is not None:
+                next_future.set_exception(error)
+                return
+            try:
+                fn(done.result()).add_done_callback(forward)
+            except Exception as e:
+                next_future.set_exception(e)
+
+        future.add_done_callback(on_done)
+        return next_future
+
+    def _submit(self, url, pools, brand_text, style, layout, output_format, options, trace, batcher=None):
+        """Queue one article through all pipeline stages, return its final future
+
+        Every stage runs with trace active, so timings and counters of the
+        article add up in its own trace whichever worker runs the stage.
+        """
+        io_pool, llm_pool, render_pool = pools
+        generator = self.generator
+        submitted = time.perf_counter()
+
+        def traced(fn):
+            def run(value):
+                with trace.activate():
+                    return fn(value)
+            return run
+
+        # Stage 1: fetch article HTML and parse it once
+        @traced
+        def fetch(url):
+            html_content = generator.fetch_article_content(url, options)
+            return generator.parse_article(html_content, url, options)
+
+        fetched = io_pool.submit(fetch, url)
+
+        # Stage 2: analyze with Gemini, in a request shared with other articles when batching
+        if batcher is not None:
+            analyzed = self._then(fetched, lambda document: batcher.submit(document, url, style, options, trace))
+        else:
+            @traced
+            def analyze(document):
+                return generator.extract_content_with_gemini(
+                    document.html, url, style=style, document=document, options=options
+                )
+
+            analyzed = self._chain(fetched, llm_pool, analyze)
+
+        # Stage 3: download background image
+        @traced
+        def download(article_data):
+            document = fetched.result()
+            background_img = generator.find_background_image(document.image_candidates(), options)
+            return article_data, background_img
+
+        downloaded = self._chain(analyzed, io_pool, download)
+
+        # Stage 4: render post
+        @traced
+        def render(state):
+            article_data, background_img = state
+            output_path = generator.build_output_path(
+                article_data['title'], output_format=output_format, options=options
+            )
+            generator.create_post_design(
+                background_img,
+                article_data['title'],
+                article_data.get('source', 'Unknown Source'),
+                output_path,
+                brand_text=brand_text,
+                layout=layout,
+                output_format=output_format,
+                options=options
+            )
+            # Same fingerprint as generate_post, so later identical jobs reuse this post
+            fingerprint = generator.job_fingerprint(url, style, layout, brand_text, output_format, options)
+            generator.record_post(output_path, url, style, layout, article_data, fingerprint)
+            return output_path
+
+        rendered = self._chain(downloaded, render_pool, render)
+
+        # total includes time spent waiting for a free worker between stages,
+        # recorded before the returned future completes
+        finished = Future()
+
+        def on_done(done):
+            trace.add_time('total', time.perf_counter() - submitted)
+            error = done.exception()
+            if error is not None:
+                finished.set_exception(error)
+            else:
+                finished.set_result(done.result())
+
+        rendered.add_done_callback(on_done)
+        return finished
+
+    def run(self, urls, brand_text=None, style="clickbait", show_source=None, layout="layout1", output_format=None,
+            options=None):
+        """Generate posts for all URLs
+
+        Returns a list of dicts with url, output_path, error and metrics, in input order.
+        """
+        if brand_text is None:
+            brand_text = os.getenv("BRAND_TEXT", None)
+
+        # One snapshot shared by every article in the batch
+        options = self.generator.job_options(show_source, options)
+
+        start = time.time()
+        results = []
+        lock = threading.Lock()
+        completed = [0]
+
+        def report(url):
+            def on_done(done):
+                with lock:
+                    completed[0] += 1
+                    status = "✓" if done.exception() is None else "✗"
+                    print(f"[{completed[0]}/{len(urls)}] {status} {url}")
+            return on_done
+
+        batcher = None
+        if self.llm_batch_size > 1:
+            batcher = LLMBatcher(self.generator, batch_size=self.llm_batch_size, workers=self.llm_workers)
+
+        with ExitStack() as stack:
+            io_pool = stack.enter_context(ThreadPoolExecutor(self.io_workers, thread_name_prefix='batch-io'))
+            # The batcher sends Gemini requests from its own pool
+            llm_pool = None
+            if batcher is None:
+                llm_pool = stack.enter_context(ThreadPoolExecutor(self.llm_workers, thread_name_prefix='batch-llm'))
+            render_pool = stack.enter_context(
+                ThreadPoolExecutor(self.render_workers, thread_name_prefix='batch-render')
+            )
+            pools = (io_pool, llm_pool, render_pool)
+            futures = []
+            for url in urls:
+                trace = Trace()
+                future = self._submit(url, pools, brand_text, style, layout, output_format, options, trace, batcher)
+                future.add_done_callback(report(url))
+                futures.append((url, future, trace))
+
+            for url, future, trace in futures:
+                try:
+                    result = {'url': url, 'output_path': future.result(), 'error': None}
+                except Exception as e:
+                    result = {'url': url, 'output_path': None, 'error': str(e)}
+                registry.observe(trace, 'ok' if result['error'] is None else 'error')
+                result['metrics'] = trace.to_dict()
+                results.append(result)
+
+        if batcher is not None:
+            batcher.close()
+
+        elapsed = time.time() - start
+        succeeded = sum(1 for r in results if r['error'] is None)
+        print(f"\nBatch finished: {succeeded}/{len(urls)} posts in {elapsed:.1f}s")
+
+        font_stats = font_registry.stats()
+        print(f"Fonts: {font_stats['fonts']} loaded in {font_stats['load_time_ms']}ms, "
+              f"~{font_stats['estimated_bytes'] / 1024:.0f} KB, {font_stats['hits']} cache hits")
+        return results
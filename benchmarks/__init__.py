@@ -0,0 +1,3 @@
+"""
+Headline AI - Offline benchmark suite (python -m benchmarks.run)
+"""
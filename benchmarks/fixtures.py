@@ -0,0 +1,185 @@
+"""
+Benchmark fixtures - generated news corpus and a local HTTP server for it
+
+Pages are sized like real news articles (~250 KB): inline scripts, navigation,
+related-article teasers with small thumbnails, a long article body and a
+full-size hero photo referenced from og:image. Everything is generated from a
+seed, so runs are comparable.
+"""
+
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+
+from PIL import Image
+
+WORDS = (
+    "pemerintah presiden menteri warga kota jakarta ekonomi harga pasar banjir "
+    "jalan tol kereta bandara sekolah rumah sakit polisi pengadilan kasus "
+    "investasi saham rupiah dolar ekspor impor petani nelayan cuaca hujan "
+    "gempa gunung pantai wisata festival musik film olahraga sepak bola timnas "
+    "liga pelatih pemain gol juara turnamen teknologi aplikasi internet digital "
+    "data keamanan siber startup pendanaan kebijakan anggaran pajak subsidi "
+    "energi listrik bahan bakar kendaraan listrik baterai tambang nikel"
+).split()
+
+SITE_NAMES = ["Kabar Harian", "Warta Kota", "Berita Nusantara", "Info Terkini"]
+
+
+def _sentence(rng, min_words=8, max_words=22):
+    words = [rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words))]
+    return " ".join(words).capitalize() + "."
+
+
+def _paragraph(rng, sentences=4):
+    return " ".join(_sentence(rng) for _ in range(sentences))
+
+
+def make_photo(rng, size, quality=88):
+    """JPEG with gradients and noise, compresses like a press photo"""
+    base = Image.linear_gradient('L').resize(size).convert('RGB')
+    tint = Image.new('RGB', size, tuple(rng.randint(40, 220) for _ in range(3)))
+    noise = Image.effect_noise(size, rng.randint(40, 70)).convert('RGB')
+    img = Image.blend(Image.blend(base, tint, 0.5), noise, 0.35)
+
+    buffer = BytesIO()
+    img.save(buffer, 'JPEG', quality=quality)
+    return buffer.getvalue()
+
+
+def make_article(rng, index, base_url, paragraphs=14):
+    """HTML page for article index, about 250 KB"""
+    site_name = SITE_NAMES[index % len(SITE_NAMES)]
+    title = _sentence(rng, 8, 14).rstrip('.')
+    description = _sentence(rng, 15, 25)
+
+    # Inline analytics/ads scripts make up a large part of real pages
+    scripts = "\n".join(
+        f"<script>window.__cfg{i} = {{{', '.join(f'k{j}: {rng.randint(0, 10 ** 9)}' for j in range(400))}}};</script>"
+        for i in range(36)
+    )
+    nav = "\n".join(
+        f'<li><a href="{base_url}/kategori/{rng.choice(WORDS)}-{i}">{rng.choice(WORDS).title()}</a></li>'
+        for i in range(150)
+    )
+    related = "\n".join(
+        f'<div class="related-item"><a href="{base_url}/article/{index}-{i}">'
+        f'<img src="{base_url}/img/thumb-{index}-{i}.jpg" width="300" height="200">'
+        f'<span>{_sentence(rng, 6, 10)}</span></a></div>'
+        for i in range(12)
+    )
+    body = "\n".join(f"<p>{_paragraph(rng, rng.randint(3, 6))}</p>" for _ in range(paragraphs))
+
+    return f"""<!DOCTYPE html>
+<html lang="id">
+<head>
+<meta charset="utf-8">
+<title>{title} - {site_name}</title>
+<meta name="description" content="{description}">
+<meta property="og:title" content="{title}">
+<meta property="og:description" content="{description}">
+<meta property="og:site_name" content="{site_name}">
+<meta property="og:image" content="{base_url}/img/hero-{index}.jpg">
+<meta name="author" content="Redaksi {site_name}">
+<meta property="article:published_time" content="2024-05-{index % 28 + 1:02d}T08:00:00+07:00">
+{scripts}
+</head>
+<body class="has-sidebar">
+<header class="site-header"><nav class="main-nav"><ul>{nav}</ul></nav></header>
+<main>
+<article class="article-content">
+<h1>{title}</h1>
+<figure><img src="{base_url}/img/hero-{index}.jpg" alt="{title}"><figcaption>{_sentence(rng)}</figcaption></figure>
+{body}
+</article>
+<aside class="sidebar related">{related}</aside>
+</main>
+<footer class="site-footer"><p>&copy; {site_name}</p></footer>
+</body>
+</html>"""
+
+
+class FixtureServer:
+    """Serve a generated corpus of articles and images on a local port
+
+    Args:
+        articles: Number of article pages
+        seed: Corpus seed
+        photos: Distinct hero photos generated (reused across articles)
+        photo_size: Hero photo size in pixels
+        latency: Seconds added before every response
+    """
+
+    def __init__(self, articles=10, seed=1, photos=4, photo_size=(1600, 1067), latency=0.0):
+        self.articles = articles
+        self.latency = latency
+        self._rng = random.Random(seed)
+        self._photos = [make_photo(self._rng, photo_size) for _ in range(photos)]
+        self._thumb = make_photo(self._rng, (300, 200), quality=80)
+        self._pages = {}
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self._server.server_port}"
+        self._thread = None
+
+        for index in range(articles):
+            html = make_article(self._rng, index, self.base_url)
+            self._pages[f"/article/{index}"] = html.encode('utf-8')
+
+    def urls(self):
+        return [f"{self.base_url}/article/{index}" for index in range(self.articles)]
+
+    def page_bytes(self):
+        """Average article page size in bytes"""
+        return sum(len(page) for page in self._pages.values()) // max(1, len(self._pages))
+
+    def photo_bytes(self):
+        """Average hero photo size in bytes"""
+        return sum(len(photo) for photo in self._photos) // max(1, len(self._photos))
+
+    def _resolve(self, path):
+        path = path.split('?', 1)[0]
+        if path in self._pages:
+            return 'text/html; charset=utf-8', self._pages[path]
+        if path.startswith('/img/hero-'):
+            index = int(path[len('/img/hero-'):-len('.jpg')])
+            return 'image/jpeg', self._photos[index % len(self._photos)]
+        if path.startswith('/img/thumb-'):
+            return 'image/jpeg', self._thumb
+        return None, None
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                if server.latency:
+                    time.sleep(server.latency)
+                content_type, body = server._resolve(self.path)
+                if body is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fixture-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,129 @@
+"""
+Benchmark LLM stub - local OpenAI-compatible chat completions server
+
+Point GEMINI_BASE_URL at LLMStub.base_url. Every request waits latency seconds
+(plus random jitter) and returns a headline JSON derived from the prompt, or
+one headline per style for multi-style prompts, or one per article id for
+multi-article prompts.
+"""
+
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.fixtures import WORDS
+
+# Style instruction blocks of MULTI_STYLE_PROMPT_TEMPLATE: "=== GAYA <style> (<name>) ==="
+STYLE_LINE = re.compile(r'^=== GAYA (\w+) ', re.MULTILINE)
+ARTICLE_LINE = re.compile(r'^=== ARTIKEL id=(\d+) ===$', re.MULTILINE)
+
+
+def _headline(prompt, salt=''):
+    """Deterministic headline for a prompt, 6-12 words"""
+    rng = random.Random(hashlib.sha256((prompt + salt).encode('utf-8')).digest())
+    words = [rng.choice(WORDS) for _ in range(rng.randint(6, 12))]
+    return " ".join(words).capitalize()
+
+
+class LLMStub:
+    """OpenAI-compatible /chat/completions stub on a local port
+
+    Args:
+        latency: Seconds each completion takes
+        jitter: Random extra seconds, uniform in [0, jitter]
+        seed: Jitter seed
+    """
+
+    def __init__(self, latency=1.0, jitter=0.2, seed=1):
+        self.latency = latency
+        self.jitter = jitter
+        self.requests = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self._server.server_port}/"
+        self._thread = None
+
+    def _delay(self):
+        with self._lock:
+            self.requests += 1
+            return self.latency + self._rng.uniform(0, self.jitter)
+
+    def completion(self, prompt):
+        """Message content the stub answers for prompt"""
+        articles = ARTICLE_LINE.split(prompt)[1:] if '"articles"' in prompt else []
+        if articles:
+            # split() alternates id, article text
+            return json.dumps({'articles': [
+                {'id': int(article_id), 'title': _headline(text), 'summary': _headline(text, 'summary'),
+                 'source': 'Stub News'}
+                for article_id, text in zip(articles[::2], articles[1::2])
+            ]})
+        styles = STYLE_LINE.findall(prompt) if '"styles"' in prompt else []
+        if styles:
+            return json.dumps({
+                'source': 'Stub News',
+                'summary': _headline(prompt, 'summary'),
+                'styles': {style: {'title': _headline(prompt, style)} for style in styles},
+            })
+        return json.dumps({
+            'title': _headline(prompt),
+            'summary': _headline(prompt, 'summary'),
+            'source': 'Stub News',
+        })
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                body = json.loads(self.rfile.read(length))
+                prompt = body['messages'][-1]['content']
+
+                time.sleep(stub._delay())
+                content = stub.completion(prompt)
+                response = json.dumps({
+                    'id': 'stub',
+                    'object': 'chat.completion',
+                    'created': int(time.time()),
+                    'model': body.get('model', 'stub'),
+                    'choices': [{
+                        'index': 0,
+                        'finish_reason': 'stop',
+                        'message': {'role': 'assistant', 'content': content},
+                    }],
+                    'usage': {
+                        'prompt_tokens': len(prompt) // 4,
+                        'completion_tokens': len(content) // 4,
+                        'total_tokens': (len(prompt) + len(content)) // 4,
+                    },
+                }).encode('utf-8')
+
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(response)))
+                self.end_headers()
+                self.wfile.write(response)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='llm-stub', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
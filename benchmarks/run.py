@@ -0,0 +1,328 @@
+"""
+Offline end-to-end benchmark
+
+Generates posts for every style and layout against a local fixture server
+(news pages and photos) and a local OpenAI-compatible stub with configurable
+latency. Nothing goes to real news sites or Gemini, and output, index,
+thumbnails and cache are written to a temporary directory.
+
+Reports per-stage and end-to-end latency percentiles, throughput and peak
+RSS, saves them to benchmarks/results/ and compares with the previous run.
+
+    python -m benchmarks.run
+    python -m benchmarks.run --articles 20 --concurrency 8 --llm-latency 2
+    python -m benchmarks.run --styles formal --layouts layout2 --compare benchmarks/results/baseline.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import config
+from benchmarks.fixtures import FixtureServer
+from benchmarks.llm_stub import LLMStub
+from metrics import Trace
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+STAGES = ['fetch', 'parse', 'distill', 'llm', 'image_probe', 'render', 'encode', 'index']
+PERCENTILES = [50, 90, 95, 99]
+
+
+def percentiles(values):
+    """Nearest-rank percentiles, max and mean in milliseconds"""
+    if not values:
+        return {}
+    ordered = sorted(values)
+    result = {}
+    for p in PERCENTILES:
+        rank = min(len(ordered), max(1, math.ceil(p / 100 * len(ordered)))) - 1
+        result[f'p{p}'] = round(ordered[rank] * 1000, 1)
+    result['max'] = round(ordered[-1] * 1000, 1)
+    result['mean'] = round(sum(ordered) / len(ordered) * 1000, 1)
+    return result
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, None where unsupported"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    if sys.platform == 'darwin':
+        peak /= 1024
+    return round(peak / 1024, 1)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def isolate_config(workdir, args):
+    """Point every file the generator writes into workdir and Gemini at the stub
+
+    Runs before the generator is created, its Options snapshot picks these up.
+    """
+    config.OUTPUT_DIR = os.path.join(workdir, 'output')
+    config.TEMP_DIR = os.path.join(workdir, 'temp_images')
+    config.THUMBNAIL_DIR = os.path.join(workdir, 'thumbnails')
+    config.POST_INDEX_PATH = os.path.join(workdir, 'posts.sqlite3')
+    config.LLM_CACHE_PATH = os.path.join(workdir, 'llm_cache.sqlite3')
+    # A warm LLM cache would hide the Gemini stage, measure it unless asked not to
+    config.LLM_CACHE_ENABLED = args.llm_cache
+    # Same for article pages and their parsed documents, every scenario fetches the same URLs
+    config.ARTICLE_CACHE_PATH = os.path.join(workdir, 'article_cache.sqlite3')
+    config.ARTICLE_CACHE_ENABLED = args.article_cache
+    if not args.article_cache:
+        config.ARTICLE_DOCUMENT_CACHE_ENTRIES = 0
+    # Fixture articles share a few photos, cached frames would hide download and decode
+    config.IMAGE_CACHE_PATH = os.path.join(workdir, 'image_cache.sqlite3')
+    config.IMAGE_CACHE_ENABLED = args.image_cache
+    # The warm-up job would otherwise answer the first scenario's identical job from the index
+    config.IDEMPOTENT_JOBS = args.idempotent
+    config.OUTPUT_FORMAT = args.format.upper()
+
+
+def generate_one(generator, url, style, layout):
+    """Generate one post, returns end-to-end and per-stage seconds"""
+    trace = Trace()
+    start = time.perf_counter()
+    generator.generate_post(url, style=style, layout=layout, trace=trace)
+    end = time.perf_counter()
+
+    stages = {stage: seconds for stage, seconds in trace.timings.items() if stage in STAGES}
+    return end - start, stages
+
+
+def run_scenario(generator, urls, style, layout, concurrency):
+    totals = []
+    stage_times = {stage: [] for stage in STAGES}
+    errors = 0
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency, thread_name_prefix='bench') as pool:
+        futures = [pool.submit(generate_one, generator, url, style, layout) for url in urls]
+        for future in futures:
+            try:
+                total, stages = future.result()
+            except Exception:
+                errors += 1
+                continue
+            totals.append(total)
+            for stage, seconds in stages.items():
+                stage_times.setdefault(stage, []).append(seconds)
+    wall = time.perf_counter() - start
+
+    return {
+        'style': style,
+        'layout': layout,
+        'posts': len(totals),
+        'errors': errors,
+        'wall_s': round(wall, 3),
+        'throughput': round(len(totals) / wall, 3) if wall else 0,
+        'latency_ms': {
+            'total': percentiles(totals),
+            **{stage: percentiles(times) for stage, times in stage_times.items()},
+        },
+        'peak_rss_mb': peak_rss_mb(),
+        '_totals': totals,
+    }
+
+
+def print_scenario(result):
+    total = result['latency_ms']['total']
+    stages = "  ".join(
+        f"{stage} {result['latency_ms'][stage].get('p50', 0):>7.1f}"
+        for stage in STAGES if result['latency_ms'].get(stage)
+    )
+    print(
+        f"{result['style']:<13} {result['layout']:<8} "
+        f"{result['posts']:>3} ok {result['errors']:>2} err  "
+        f"p50 {total.get('p50', 0):>7.1f}  p95 {total.get('p95', 0):>7.1f} ms  "
+        f"{result['throughput']:>6.2f}/s  | p50 {stages}"
+    )
+
+
+def latest_result(exclude=None):
+    if not os.path.isdir(RESULTS_DIR):
+        return None
+    files = sorted(
+        os.path.join(RESULTS_DIR, name) for name in os.listdir(RESULTS_DIR)
+        if name.endswith('.json') and os.path.join(RESULTS_DIR, name) != exclude
+    )
+    return files[-1] if files else None
+
+
+def compare(current, previous_path, threshold):
+    """Print changes against a previous result file, returns number of regressions"""
+    with open(previous_path) as f:
+        previous = json.load(f)
+
+    print(f"\nCompared with {previous_path} ({previous.get('git_commit') or 'unknown commit'}):")
+    regressions = 0
+
+    def line(label, now, before, higher_is_better=False):
+        nonlocal regressions
+        if not before:
+            return
+        change = (now - before) / before * 100
+        worse = change < -threshold if higher_is_better else change > threshold
+        regressions += worse
+        flag = "  REGRESSION" if worse else ""
+        print(f"  {label:<38} {before:>9.1f} -> {now:>9.1f}  ({change:+.1f}%){flag}")
+
+    summary, old_summary = current['summary'], previous.get('summary', {})
+    line('throughput (posts/s)', summary['throughput'], old_summary.get('throughput'), higher_is_better=True)
+    for key in ('p50', 'p95'):
+        line(f'total {key} (ms)', summary['latency_ms'][key], old_summary.get('latency_ms', {}).get(key))
+    line('peak RSS (MB)', summary['peak_rss_mb'] or 0, old_summary.get('peak_rss_mb'))
+
+    old_scenarios = {(s['style'], s['layout']): s for s in previous.get('scenarios', [])}
+    for scenario in current['scenarios']:
+        old = old_scenarios.get((scenario['style'], scenario['layout']))
+        if old:
+            line(
+                f"{scenario['style']}/{scenario['layout']} p95 (ms)",
+                scenario['latency_ms']['total'].get('p95', 0),
+                old['latency_ms']['total'].get('p95')
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline end-to-end benchmark with stub article and LLM servers')
+    parser.add_argument('--articles', type=int, default=10, help='Articles per scenario (default: 10)')
+    parser.add_argument('--concurrency', type=int, default=4, help='Posts generated in parallel (default: 4)')
+    parser.add_argument('--styles', nargs='+', default=list(config.HEADLINE_STYLES),
+                        choices=list(config.HEADLINE_STYLES), help='Styles to run (default: all)')
+    parser.add_argument('--layouts', nargs='+', default=list(config.AVAILABLE_LAYOUTS),
+                        choices=list(config.AVAILABLE_LAYOUTS), help='Layouts to run (default: all)')
+    parser.add_argument('--llm-latency', type=float, default=1.0, help='Stub completion latency in seconds (default: 1.0)')
+    parser.add_argument('--llm-jitter', type=float, default=0.2, help='Random extra stub latency in seconds (default: 0.2)')
+    parser.add_argument('--fetch-latency', type=float, default=0.05,
+                        help='Fixture server latency per request in seconds (default: 0.05)')
+    parser.add_argument('--format', default='png', choices=['png', 'jpeg', 'webp'], help='Output format (default: png)')
+    parser.add_argument('--llm-cache', action='store_true', help='Keep the Gemini result cache enabled')
+    parser.add_argument('--article-cache', action='store_true', help='Keep the article page and parse caches enabled')
+    parser.add_argument('--image-cache', action='store_true', help='Keep the background image and frame caches enabled')
+    parser.add_argument('--idempotent', action='store_true', help='Keep returning existing posts for identical jobs')
+    parser.add_argument('--seed', type=int, default=1, help='Corpus and latency seed (default: 1)')
+    parser.add_argument('--compare', metavar='FILE', help='Result file to compare with (default: latest in results/)')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='Change in percent reported as regression (default: 10)')
+    parser.add_argument('--no-save', action='store_true', help='Do not write a result file')
+    parser.add_argument('--verbose', action='store_true', help='Show generator output')
+    args = parser.parse_args()
+
+    os.environ.setdefault('GEMINI_API_KEY', 'benchmark')
+
+    with tempfile.TemporaryDirectory(prefix='headline-bench-') as workdir:
+        isolate_config(workdir, args)
+
+        print("Building fixture corpus...")
+        fixtures = FixtureServer(articles=args.articles, seed=args.seed, latency=args.fetch_latency).start()
+        stub = LLMStub(latency=args.llm_latency, jitter=args.llm_jitter, seed=args.seed).start()
+        config.GEMINI_BASE_URL = stub.base_url
+
+        from headline_generator import HeadlineGenerator
+
+        quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+        try:
+            with quiet:
+                generator = HeadlineGenerator()
+                # Warm-up: fonts, connection pools and imports, not measured
+                generate_one(generator, fixtures.urls()[0], args.styles[0], args.layouts[0])
+
+            print(
+                f"Corpus: {args.articles} articles, ~{fixtures.page_bytes() / 1024:.0f} KB HTML, "
+                f"~{fixtures.photo_bytes() / 1024:.0f} KB photos | LLM stub {args.llm_latency}s "
+                f"+{args.llm_jitter}s | concurrency {args.concurrency}\n"
+            )
+
+            scenarios = []
+            start = time.perf_counter()
+            for layout in args.layouts:
+                for style in args.styles:
+                    with quiet:
+                        result = run_scenario(generator, fixtures.urls(), style, layout, args.concurrency)
+                    print_scenario(result)
+                    scenarios.append(result)
+            wall = time.perf_counter() - start
+
+            generator.close()
+        finally:
+            stub.stop()
+            fixtures.stop()
+
+    all_totals = [t for scenario in scenarios for t in scenario.pop('_totals')]
+    posts = sum(scenario['posts'] for scenario in scenarios)
+    results = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': {
+            'articles': args.articles,
+            'concurrency': args.concurrency,
+            'llm_latency': args.llm_latency,
+            'llm_jitter': args.llm_jitter,
+            'fetch_latency': args.fetch_latency,
+            'format': args.format,
+            'llm_cache': args.llm_cache,
+            'article_cache': args.article_cache,
+            'image_cache': args.image_cache,
+            'seed': args.seed,
+            'llm_requests': stub.requests,
+        },
+        'summary': {
+            'posts': posts,
+            'errors': sum(scenario['errors'] for scenario in scenarios),
+            'wall_s': round(wall, 3),
+            'throughput': round(posts / wall, 3) if wall else 0,
+            'latency_ms': percentiles(all_totals),
+            'peak_rss_mb': peak_rss_mb(),
+        },
+        'scenarios': scenarios,
+    }
+
+    summary = results['summary']
+    print(
+        f"\nTotal: {summary['posts']} posts, {summary['errors']} errors in {summary['wall_s']:.1f}s "
+        f"({summary['throughput']:.2f} posts/s) | p50 {summary['latency_ms'].get('p50', 0):.1f} ms, "
+        f"p95 {summary['latency_ms'].get('p95', 0):.1f} ms | peak RSS {summary['peak_rss_mb']} MB"
+    )
+
+    previous = args.compare or latest_result()
+    saved = None
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        saved = os.path.join(RESULTS_DIR, datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+        with open(saved, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to {saved}")
+
+    if previous and previous != saved:
+        regressions = compare(results, previous, args.threshold)
+        if regressions:
+            print(f"\n{regressions} metrics changed by more than {args.threshold:.0f}%")
+
+
+if __name__ == '__main__':
+    main()
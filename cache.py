@@ -0,0 +1,232 @@
+"""
+Headline AI - Cache building blocks
+
+LRUCache keeps recent values in memory, DiskCache persists them in SQLite with
+TTL and size-based eviction, and TieredCache puts the first in front of the
+second for JSON values.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def make_key(*parts):
+    """Stable SHA-256 key from JSON-serializable parts"""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LRUCache:
+    def __init__(self, max_entries=256, max_bytes=None, sizeof=None):
+        """Thread-safe in-memory LRU cache
+
+        Args:
+            max_entries: Maximum number of values kept
+            max_bytes: Optional byte budget, requires sizeof
+            sizeof: Function returning the size of a value in bytes
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or (lambda value: 0)
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key][0]
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        with self._lock:
+            if key in self._data:
+                self._bytes -= self._data.pop(key)[1]
+            self._data[key] = (value, size)
+            self._bytes += size
+
+            # Evict least recently used values until within budget
+            while self._data and (
+                len(self._data) > self.max_entries
+                or (self.max_bytes is not None and self._bytes > self.max_bytes)
+            ):
+                _, (_, evicted_size) = self._data.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._data:
+                self._bytes -= self._data.pop(key)[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    @property
+    def size_bytes(self):
+        return self._bytes
+
+
+class DiskCache:
+    def __init__(self, path, ttl=None, max_bytes=None):
+        """SQLite-backed key/value store with TTL and size-based eviction
+
+        Args:
+            path: SQLite database file
+            ttl: Seconds before an entry expires (None = never)
+            max_bytes: Total value size budget, least recently used entries evicted first
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            ' key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL,'
+            ' created REAL NOT NULL, accessed REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)')
+        self._conn.commit()
+
+    def get(self, key, max_age=None):
+        """Return stored value, or None if missing or older than ttl/max_age"""
+        entry = self.get_entry(key, max_age)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, key, max_age=None):
+        """Return (value, created timestamp), or None if missing or older than ttl/max_age"""
+        max_age = max_age if max_age is not None else self.ttl
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT value, created FROM entries WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created = row
+            if max_age is not None and now - created > max_age:
+                return None
+            self._conn.execute('UPDATE entries SET accessed = ? WHERE key = ?', (now, key))
+            self._conn.commit()
+            return value, created
+
+    def put(self, key, value):
+        """Store bytes or str value and evict expired / least recently used entries"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO entries (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)',
+                (key, value, len(value), now, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def touch(self, key):
+        """Reset an entry's age (e.g. after successful revalidation)"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute('UPDATE entries SET created = ?, accessed = ? WHERE key = ?', (now, now, key))
+            self._conn.commit()
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+            self._conn.commit()
+
+    def _evict(self, now):
+        if self.ttl is not None:
+            self._conn.execute('DELETE FROM entries WHERE created < ?', (now - self.ttl,))
+
+        if self.max_bytes is not None:
+            total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+            if total > self.max_bytes:
+                rows = self._conn.execute('SELECT key, size FROM entries ORDER BY accessed').fetchall()
+                for key, size in rows:
+                    if total <= self.max_bytes:
+                        break
+                    self._conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+                    total -= size
+
+    def stats(self):
+        with self._lock:
+            count, total = self._conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries'
+            ).fetchone()
+        return {'entries': count, 'bytes': total}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class TieredCache:
+    def __init__(self, path, memory_entries=256, ttl=None, max_bytes=None):
+        """In-memory LRU in front of a DiskCache, storing JSON values"""
+        self.memory = LRUCache(max_entries=memory_entries)
+        self.disk = DiskCache(path, ttl=ttl, max_bytes=max_bytes)
+        self.ttl = ttl
+        self.hits = 0
+        self.memory_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        entry = self.memory.get(key)
+        if entry is not None:
+            value, stored_at = entry
+            if self.ttl is None or time.time() - stored_at <= self.ttl:
+                with self._lock:
+                    self.hits += 1
+                    self.memory_hits += 1
+                return value
+            self.memory.delete(key)
+
+        stored = self.disk.get_entry(key)
+        if stored is not None:
+            raw, created = stored
+            value = json.loads(raw)
+            # Keep the disk entry's age, the memory copy expires when the disk entry does
+            self.memory.put(key, (value, created))
+            with self._lock:
+                self.hits += 1
+            return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, value):
+        self.memory.put(key, (value, time.time()))
+        self.disk.put(key, json.dumps(value, ensure_ascii=False))
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'memory_hits': self.memory_hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'memory_entries': len(self.memory),
+            **{f'disk_{k}': v for k, v in self.disk.stats().items()},
+        }
+
+    def close(self):
+        self.disk.close()
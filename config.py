@@ -49,6 +49,11 @@ BOX_RADIUS = 20  # Corner radius
 LINE_HEIGHT = 60  # Space between lines
 MAX_TITLE_LENGTH = 150  # Maximum characters for title
 
+# Auto-shrink title font to fit a line budget (set TITLE_MAX_LINES = None to disable)
+TITLE_MAX_LINES = None  # e.g. 4
+TITLE_MIN_FONT_SIZE = 32  # Smallest title font size when shrinking
+TITLE_FONT_SIZE_STEP = 2  # Font size decrement per shrink step
+
 # ============================================================================
 # BRANDING & SOURCE
 # ============================================================================
@@ -259,9 +264,85 @@ PENTING: Response HARUS valid JSON tanpa markdown!"""
 # Backward compatibility: Keep AI_PROMPT_TEMPLATE as default clickbait style
 AI_PROMPT_TEMPLATE = HEADLINE_STYLES["clickbait"]["prompt"]
 
-# Maximum HTML content length to send to AI (characters)
+# Multi-style prompt: one Gemini call returns a headline for every requested style
+# {style_instructions} is filled with the "prompt" of every requested style from HEADLINE_STYLES.
+# One call has one temperature: MULTI_STYLE_TEMPERATURE is used instead of the per-style temperatures
+MULTI_STYLE_TEMPERATURE = 0.8
+MULTI_STYLE_PROMPT_TEMPLATE = """Analisis HTML berita berikut dan buat beberapa versi headline, satu untuk tiap gaya:
+
+URL: {url}
+HTML: {html_content}
+
+Tugas kamu:
+1. Baca dan pahami inti berita dari HTML
+2. Identifikasi SUMBER berita (nama media/publisher, seperti "Kompas", "Detik", "CNN Indonesia", dll)
+3. Buat SATU headline untuk SETIAP gaya berikut, ikuti instruksi gaya masing-masing:
+
+{style_instructions}
+
+4. Setiap headline harus:
+   - Maksimal {max_title_length} karakter
+   - Berbeda satu sama lain sesuai gaya masing-masing
+
+Abaikan format response di instruksi gaya, gunakan format ini:
+Response JSON: {{"source": "nama media", "summary": "ringkasan", "styles": {{"<key gaya>": {{"title": "headline"}}}}}}
+PENTING: Response HARUS valid JSON tanpa markdown, gunakan key gaya persis seperti di daftar!"""
+
+# Multi-article prompt: batch mode sends several articles of one style in one Gemini call
+# {instructions} is the style prompt, {articles} the articles with their ids
+MULTI_ARTICLE_PROMPT_TEMPLATE = """Buat headline untuk SETIAP artikel berita di daftar bawah, masing-masing secara terpisah.
+Ikuti instruksi berikut untuk setiap artikel:
+
+{instructions}
+
+DAFTAR ARTIKEL:
+{articles}
+
+Response JSON: {{"articles": [{{"id": <id artikel>, "title": "headline", "summary": "ringkasan", "source": "nama media"}}]}}
+PENTING: Response HARUS valid JSON tanpa markdown, dengan tepat satu item untuk setiap id artikel!"""
+
+# HTML parser backend: "lxml" (fast, falls back to "html.parser" if not installed)
+HTML_PARSER = "lxml"
+
+# Maximum HTML content length to send to AI (characters), used when distillation is off
 MAX_HTML_LENGTH = 30000
 
+# Content distillation: send title, metadata and main article text instead of raw HTML
+DISTILL_CONTENT = True
+MAX_CONTENT_TOKENS = 2000  # Token budget for distilled content
+DISTILL_CHARS_PER_TOKEN = 4  # Rough estimate used to fit the token budget
+DISTILL_MIN_BLOCK_LENGTH = 25  # Skip shorter text blocks (captions, labels, buttons)
+DISTILL_MIN_LENGTH = 200  # Fall back to raw HTML if distilled text is shorter
+
+# ============================================================================
+# CACHE SETTINGS
+# ============================================================================
+
+CACHE_DIR = "cache"
+
+# Gemini results, keyed by content, style, prompt template, model and temperature
+LLM_CACHE_ENABLED = True
+LLM_CACHE_PATH = CACHE_DIR + "/llm_cache.sqlite3"
+LLM_CACHE_MEMORY_ENTRIES = 512  # In-memory LRU in front of the disk store
+LLM_CACHE_TTL = 7 * 24 * 3600  # seconds
+LLM_CACHE_MAX_BYTES = 50 * 1024 * 1024  # Disk budget, least recently used evicted first
+
+# Article pages, revalidated with ETag/Last-Modified (conditional GET)
+ARTICLE_CACHE_ENABLED = True
+ARTICLE_CACHE_PATH = CACHE_DIR + "/article_cache.sqlite3"
+ARTICLE_CACHE_FRESH = 300  # seconds a cached page is used without asking the server (0 = always revalidate)
+ARTICLE_CACHE_TTL = 24 * 3600  # seconds a page is kept for revalidation
+ARTICLE_CACHE_MAX_BYTES = 100 * 1024 * 1024  # Disk budget, least recently used evicted first
+ARTICLE_DOCUMENT_CACHE_ENTRIES = 32  # Parsed pages kept in memory while their HTML is unchanged
+
+# Background images, stored once per content hash and revalidated with ETag/Last-Modified
+IMAGE_CACHE_ENABLED = True
+IMAGE_CACHE_PATH = CACHE_DIR + "/image_cache.sqlite3"
+IMAGE_CACHE_FRESH = 24 * 3600  # seconds a cached image is used without asking the server
+IMAGE_CACHE_TTL = 7 * 24 * 3600  # seconds an image is kept for revalidation
+IMAGE_CACHE_MAX_BYTES = 500 * 1024 * 1024  # Disk budget, least recently used evicted first
+FRAME_CACHE_MAX_BYTES = 256 * 1024 * 1024  # Decoded, cover-resized backgrounds kept in memory
+
 # ============================================================================
 # IMAGE EXTRACTION SETTINGS
 # ============================================================================
@@ -273,6 +354,15 @@ MIN_IMAGE_HEIGHT = 300
 # Maximum number of image candidates to try downloading
 MAX_IMAGE_CANDIDATES = 5
 
+# Image candidates are probed in parallel, streaming only until the header is known
+IMAGE_PROBE_WORKERS = 16
+IMAGE_STREAM_CHUNK_SIZE = 16 * 1024  # bytes per read
+IMAGE_HEADER_MAX_BYTES = 512 * 1024  # Give up if no image header within this many bytes
+
+# Decode large JPEGs at reduced resolution close to the output size (much faster, less memory)
+FAST_DECODE = True
+RESIZE_REDUCING_GAP = 3.0  # Integer reduce before LANCZOS (None = LANCZOS only, slowest)
+
 # Number of article images to extract
 MAX_ARTICLE_IMAGES = 5
 
@@ -285,12 +375,59 @@ MAX_GENERAL_IMAGES = 10
 
 OUTPUT_DIR = "output"
 TEMP_DIR = "temp_images"
-OUTPUT_FORMAT = "PNG"
-OUTPUT_QUALITY = 95
+OUTPUT_FORMAT = "PNG"  # PNG, JPEG or WEBP (compare with: python encoders.py output/post.png)
+OUTPUT_QUALITY = 95  # JPEG/WebP quality (no effect on PNG)
+PNG_COMPRESS_LEVEL = 6  # 0-9, higher = smaller file but slower encode
+JPEG_OPTIMIZE = True  # Optimized Huffman tables, slightly smaller files
+JPEG_PROGRESSIVE = True  # Progressive JPEG, renders early on slow connections
+WEBP_METHOD = 4  # 0-6, higher = smaller file but slower encode
+
+# Index of generated posts used by the gallery (SQLite, kept outside OUTPUT_DIR)
+POST_INDEX_PATH = "posts.sqlite3"
+GALLERY_PAGE_SIZE = 48
+
+# Identical jobs (URL, style, layout, brand, source setting, format, config) return the existing
+# post from the index, and identical jobs running at the same time are generated once
+IDEMPOTENT_JOBS = True
+IDEMPOTENT_JOBS_MAX_AGE = 24 * 3600  # seconds an existing post is reused (0 = forever)
+
+# Gallery/API thumbnails, named by content hash and cached by browsers forever
+THUMBNAIL_DIR = "thumbnails"
+THUMBNAIL_SIZE = 320  # Longest side in pixels
+THUMBNAIL_FORMAT = "WEBP"
+THUMBNAIL_QUALITY = 80
+THUMBNAIL_ON_RENDER = True  # False = create lazily on first gallery view
+THUMBNAIL_MAX_AGE = 31536000  # Cache-Control max-age in seconds (1 year)
 
 # ============================================================================
 # REQUEST SETTINGS
 # ============================================================================
 
-REQUEST_TIMEOUT = 30  # seconds
+REQUEST_TIMEOUT = 30  # seconds (legacy single timeout, used as read timeout)
+HTTP_CONNECT_TIMEOUT = 5  # seconds to establish TCP+TLS connection
+HTTP_READ_TIMEOUT = REQUEST_TIMEOUT  # seconds to wait between bytes from server
+HTTP_POOL_CONNECTIONS = 20  # Number of hosts to keep connection pools for
+HTTP_POOL_MAXSIZE = 16  # Keep-alive connections per host (>= BATCH_IO_WORKERS)
+HTTP_MAX_RETRIES = 2  # Retries when connecting fails (not on read timeouts or HTTP errors)
+ARTICLE_MAX_BYTES = 2 * 1024 * 1024  # Stop reading article pages after this many bytes (0 = no limit)
+ARTICLE_CHUNK_SIZE = 64 * 1024  # bytes per read
+ARTICLE_EARLY_CUTOFF = True  # Stop reading once </body> has arrived
 USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+# ============================================================================
+# BATCH SETTINGS
+# ============================================================================
+
+BATCH_IO_WORKERS = 16  # Concurrent article fetches and image downloads
+BATCH_LLM_WORKERS = 4  # Concurrent Gemini calls (keep within API rate limits)
+BATCH_RENDER_WORKERS = 4  # Concurrent post renders
+LLM_BATCH_SIZE = 4  # Articles per Gemini request in batch mode (1 = one request per article)
+LLM_BATCH_MAX_WAIT = 0.5  # seconds an article waits for others to fill its request
+
+# ============================================================================
+# WEB JOB SETTINGS
+# ============================================================================
+
+JOB_WORKERS = 4  # Generation jobs running at the same time in the web app
+JOB_MAX_PENDING = 50  # Queued + running jobs before new submissions get HTTP 429
+JOB_HISTORY = 500  # Finished jobs kept for status lookups
@@ -0,0 +1,160 @@
+"""
+Headline AI - Output encoders
+
+Posts are saved as PNG, JPEG or WebP with per-format settings from config.
+Run this module on a rendered post to compare encode time against file size:
+
+    python encoders.py output/post_example.png
+"""
+
+import argparse
+import os
+import time
+from io import BytesIO
+
+from PIL import Image
+
+import config
+
+# Output format -> file extension
+FORMATS = {
+    'PNG': '.png',
+    'JPEG': '.jpg',
+    'WEBP': '.webp',
+}
+
+# Output format -> MIME type (Image.MIME stays empty until Pillow loads its plugins)
+MIMETYPES = {
+    'PNG': 'image/png',
+    'JPEG': 'image/jpeg',
+    'WEBP': 'image/webp',
+}
+
+# Encoder variants compared by the benchmark, (format, encoder option overrides)
+BENCHMARK_VARIANTS = [
+    ('PNG', {'compress_level': 1}),
+    ('PNG', {'compress_level': 6}),
+    ('PNG', {'compress_level': 9}),
+    ('JPEG', {'quality': 85, 'optimize': False, 'progressive': False}),
+    ('JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+    ('JPEG', {'quality': 95, 'optimize': True, 'progressive': True}),
+    ('WEBP', {'quality': 80, 'method': 4}),
+    ('WEBP', {'quality': 90, 'method': 4}),
+    ('WEBP', {'quality': 80, 'method': 6}),
+]
+
+
+def normalize_format(output_format, options=None):
+    """Canonical format name, accepts e.g. "jpg" or "webp" """
+    output_format = (output_format or (options or config).OUTPUT_FORMAT).upper()
+    if output_format == 'JPG':
+        output_format = 'JPEG'
+    if output_format not in FORMATS:
+        raise ValueError(f"Unsupported output format: {output_format} (use {', '.join(FORMATS)})")
+    return output_format
+
+
+def format_for_path(path):
+    """Output format matching the file extension of path, or None"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.jpeg':
+        ext = '.jpg'
+    for output_format, format_ext in FORMATS.items():
+        if ext == format_ext:
+            return output_format
+    return None
+
+
+def extension(output_format=None, options=None):
+    return FORMATS[normalize_format(output_format, options)]
+
+
+def mimetype(output_format=None, options=None):
+    return MIMETYPES[normalize_format(output_format, options)]
+
+
+def encoder_options(output_format=None, options=None, **overrides):
+    """Pillow save() options for output_format from options (default: config), with overrides"""
+    options = options or config
+    output_format = normalize_format(output_format, options)
+
+    if output_format == 'PNG':
+        # quality has no effect on PNG, compress_level trades encode time for size
+        save_options = {'compress_level': options.PNG_COMPRESS_LEVEL}
+    elif output_format == 'JPEG':
+        save_options = {
+            'quality': options.OUTPUT_QUALITY,
+            'optimize': options.JPEG_OPTIMIZE,
+            'progressive': options.JPEG_PROGRESSIVE,
+        }
+    else:
+        save_options = {
+            'quality': options.OUTPUT_QUALITY,
+            'method': options.WEBP_METHOD,
+        }
+
+    save_options.update(overrides)
+    return save_options
+
+
+def save_image(img, fp, output_format=None, options=None, **overrides):
+    """Encode an RGB image to a path or file object
+
+    The format is output_format, else the extension of a path, else OUTPUT_FORMAT.
+    """
+    if output_format is None and isinstance(fp, str):
+        output_format = format_for_path(fp)
+    output_format = normalize_format(output_format, options)
+
+    img.save(fp, output_format, **encoder_options(output_format, options, **overrides))
+    return output_format
+
+
+def benchmark(img, variants=None, repeat=3):
+    """Encode img with each variant, returns dicts with format, options, best time (ms) and size
+
+    Args:
+        variants: (format, encoder option overrides) pairs (default: BENCHMARK_VARIANTS)
+    """
+    results = []
+    for output_format, overrides in variants or BENCHMARK_VARIANTS:
+        best = None
+        size = 0
+        for _ in range(repeat):
+            buffer = BytesIO()
+            start = time.perf_counter()
+            save_image(img, buffer, output_format, **overrides)
+            elapsed = (time.perf_counter() - start) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+            size = buffer.tell()
+
+        results.append({
+            'format': output_format,
+            'options': encoder_options(output_format, **overrides),
+            'encode_ms': best,
+            'bytes': size,
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare output encoders on a rendered post')
+    parser.add_argument('image', help='Rendered post to re-encode (e.g. output/post_example.png)')
+    parser.add_argument('--repeat', type=int, default=3, help='Encodes per option, best time is reported (default: 3)')
+    args = parser.parse_args()
+
+    with Image.open(args.image) as img:
+        img = img.convert('RGB')
+
+    print(f"Image: {args.image} ({img.width}x{img.height})\n")
+    print(f"{'Format':<6}  {'Options':<50}  {'Encode':>9}  {'Size':>9}")
+    for result in benchmark(img, repeat=args.repeat):
+        options = ', '.join(f"{key}={value}" for key, value in result['options'].items())
+        print(
+            f"{result['format']:<6}  {options:<50}  "
+            f"{result['encode_ms']:>7.1f}ms  {result['bytes'] / 1024:>6.1f} KB"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Headline AI - Process-wide font registry
+
+Each (path, size) TrueType font is loaded once per process and shared by all
+renders. Pillow's FreeType binding does not release the GIL, so a loaded font
+is safe to use from several render threads at once.
+"""
+
+import os
+import threading
+import time
+
+from PIL import ImageFont
+
+import config
+
+
+class FontRegistry:
+    def __init__(self):
+        self._fonts = {}
+        self._lock = threading.Lock()
+        self.load_time = 0.0
+        self.loads = 0
+        self.hits = 0
+        self.fallbacks = 0
+
+    def get(self, path, size):
+        """Return font for (path, size), loading it on first use
+
+        Falls back to Pillow's default font if path is None or cannot be loaded.
+        """
+        key = (path, size)
+        font = self._fonts.get(key)
+        if font is not None:
+            self.hits += 1
+            return font
+
+        with self._lock:
+            # Another thread may have loaded it while we waited
+            font = self._fonts.get(key)
+            if font is not None:
+                self.hits += 1
+                return font
+
+            start = time.perf_counter()
+            try:
+                if path is None:
+                    raise OSError("no font path configured")
+                font = ImageFont.truetype(path, size)
+            except OSError:
+                print(f"Font {path} not found, using default...")
+                font = ImageFont.load_default()
+                self.fallbacks += 1
+            self.load_time += time.perf_counter() - start
+            self.loads += 1
+
+            self._fonts[key] = font
+            return font
+
+    def preload(self, specs=None):
+        """Load fonts ahead of the first render
+
+        Args:
+            specs: List of (path, size), default: title, source and brand fonts from config
+        """
+        if specs is None:
+            specs = [
+                (config.TITLE_FONT_PATH, config.TITLE_FONT_SIZE),
+                (config.SOURCE_FONT_PATH, config.SOURCE_FONT_SIZE),
+                (config.SOURCE_FONT_PATH, config.BRAND_FONT_SIZE),
+            ]
+        for path, size in specs:
+            self.get(path, size)
+
+    def stats(self):
+        """Loaded fonts, total load time and estimated memory footprint
+
+        Each FreeType face keeps roughly its font file in memory, so the footprint
+        is estimated as the sum of file sizes over loaded (path, size) entries.
+        """
+        footprint = 0
+        for path, _ in self._fonts:
+            if path and os.path.exists(path):
+                footprint += os.path.getsize(path)
+
+        return {
+            'fonts': len(self._fonts),
+            'loads': self.loads,
+            'hits': self.hits,
+            'fallbacks': self.fallbacks,
+            'load_time_ms': round(self.load_time * 1000, 2),
+            'estimated_bytes': footprint,
+        }
+
+
+# Shared by every HeadlineGenerator in the process
+font_registry = FontRegistry()
+
+
+def get_font(path, size):
+    """Return cached font from the process-wide registry"""
+    return font_registry.get(path, size)
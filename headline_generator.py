@@ -5,13 +5,18 @@ Headline AI - Generate social media posts from news articles
 
 import os
 import re
+import contextvars
+import threading
+import uuid
 import requests
-from bs4 import BeautifulSoup
-from PIL import Image, ImageDraw, ImageFont
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from PIL import Image, ImageDraw
 from io import BytesIO
-from urllib.parse import urlparse, urljoin
+from urllib.parse import urlparse
 from dotenv import load_dotenv
 from openai import OpenAI
+from concurrent.futures import Future, ThreadPoolExecutor
 import json
 
 # Load environment variables
@@ -19,11 +24,33 @@ load_dotenv()
 
 # Import all configuration
 import config
+from cache import LRUCache, TieredCache, make_key
+from fonts import font_registry, get_font
+from post_index import get_post_index
+from thumbnails import create_thumbnail, remove_thumbnail
+from text_layout import fit_text, wrap_text
+from image_ops import cover_resize
+from image_cache import ImageCache
+from encoders import extension, normalize_format, save_image
+from render_assets import get_gradient_layer, get_solid_overlay, preload as preload_render_assets
+from html_document import ArticleDocument
+from article_fetch import ArticleCache, decode_article, read_article
+from metrics import Trace, count, registry, timed
+from options import Options
+
+# Stand-ins for the per-article fields of a style prompt inside the multi-style prompt
+STYLE_PLACEHOLDERS = {'url': '(lihat URL di atas)', 'html_content': '(lihat HTML di atas)'}
 
 
 class HeadlineGenerator:
-    def __init__(self):
-        """Initialize the Headline Generator with Gemini API"""
+    def __init__(self, options=None):
+        """Initialize the Headline Generator with Gemini API
+
+        Args:
+            options: Default Options for jobs that don't pass their own (default: snapshot of config)
+        """
+        self.options = options or Options.from_config()
+
         api_key = os.getenv("GEMINI_API_KEY")
         if not api_key:
             raise ValueError("GEMINI_API_KEY not found in .env file")
@@ -33,249 +60,568 @@ class HeadlineGenerator:
             api_key=api_key,
             base_url=config.GEMINI_BASE_URL
         )
-        self.model = config.GEMINI_MODEL
+
+        # Shared keep-alive HTTP session for article and image fetches
+        self.http = self._create_http_session()
+
+        # Worker pool for probing image candidates in parallel
+        self.image_pool = ThreadPoolExecutor(config.IMAGE_PROBE_WORKERS, thread_name_prefix='image-probe')
+
+        # Persistent cache of Gemini results
+        self.llm_cache = None
+        if config.LLM_CACHE_ENABLED:
+            self.llm_cache = TieredCache(
+                config.LLM_CACHE_PATH,
+                memory_entries=config.LLM_CACHE_MEMORY_ENTRIES,
+                ttl=config.LLM_CACHE_TTL,
+                max_bytes=config.LLM_CACHE_MAX_BYTES
+            )
+
+        # Article pages on disk for conditional GETs, parsed documents in memory
+        self.article_cache = None
+        if config.ARTICLE_CACHE_ENABLED:
+            self.article_cache = ArticleCache(
+                config.ARTICLE_CACHE_PATH,
+                ttl=config.ARTICLE_CACHE_TTL,
+                max_bytes=config.ARTICLE_CACHE_MAX_BYTES
+            )
+        self.document_cache = LRUCache(max_entries=config.ARTICLE_DOCUMENT_CACHE_ENTRIES)
+
+        # Background images by content hash on disk, cover-resized frames in memory
+        self.image_cache = None
+        if config.IMAGE_CACHE_ENABLED:
+            self.image_cache = ImageCache(
+                config.IMAGE_CACHE_PATH,
+                ttl=config.IMAGE_CACHE_TTL,
+                max_bytes=config.IMAGE_CACHE_MAX_BYTES,
+                frame_bytes=config.FRAME_CACHE_MAX_BYTES
+            )
+
+        # Jobs being generated right now by fingerprint, duplicates wait for these
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+
+        # Load fonts once per process, before the first render
+        font_registry.preload()
+        preload_render_assets()
 
         # Create output directory
         os.makedirs(config.OUTPUT_DIR, exist_ok=True)
         os.makedirs(config.TEMP_DIR, exist_ok=True)
 
-    def fetch_article_content(self, url):
-        """Fetch HTML content from URL"""
-        print(f"Fetching article from: {url}")
-        headers = {
-            'User-Agent': config.USER_AGENT
-        }
-        response = requests.get(url, headers=headers, timeout=config.REQUEST_TIMEOUT)
-        response.raise_for_status()
-        return response.text
+    def _create_http_session(self):
+        """Create pooled HTTP session reusing TCP+TLS connections per host"""
+        session = requests.Session()
+        session.headers['User-Agent'] = config.USER_AGENT
+        # Only failed connects are retried: a read timeout would cost HTTP_READ_TIMEOUT again
+        retries = Retry(total=config.HTTP_MAX_RETRIES, connect=config.HTTP_MAX_RETRIES,
+                        read=0, status=0)
+        adapter = HTTPAdapter(
+            pool_connections=config.HTTP_POOL_CONNECTIONS,
+            pool_maxsize=config.HTTP_POOL_MAXSIZE,
+            max_retries=retries
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    @property
+    def http_timeout(self):
+        """(connect, read) timeout tuple for HTTP requests"""
+        return (config.HTTP_CONNECT_TIMEOUT, config.HTTP_READ_TIMEOUT)
+
+    def close(self):
+        """Close pooled HTTP connections, worker pools and cache files"""
+        self.image_pool.shutdown(wait=False, cancel_futures=True)
+        self.http.close()
+        if self.llm_cache is not None:
+            self.llm_cache.close()
+        if self.article_cache is not None:
+            self.article_cache.close()
+        if self.image_cache is not None:
+            self.image_cache.close()
+
+    def fetch_article_content(self, url, options=None):
+        """Fetch HTML content from URL
+
+        The body is streamed, capped at ARTICLE_MAX_BYTES and cut off once
+        </body> has arrived, see article_fetch.read_article. Cached pages
+        are used as they are for ARTICLE_CACHE_FRESH seconds, then revalidated.
+        """
+        options = options or self.options
+        with timed('fetch'):
+            cached = None
+            headers = {}
+            if self.article_cache is not None:
+                if options.ARTICLE_CACHE_FRESH:
+                    fresh = self.article_cache.get(url, max_age=options.ARTICLE_CACHE_FRESH)
+                    if fresh is not None:
+                        print(f"✓ Using cached article: {url}")
+                        count('article_cache_hits')
+                        return fresh['html']
+                cached = self.article_cache.get(url)
+                if cached is not None:
+                    headers = self.article_cache.conditional_headers(cached)
+
+            print(f"Fetching article from: {url}")
+            with self.http.get(url, headers=headers, timeout=self.http_timeout, stream=True) as response:
+                if response.status_code == 304 and cached is not None:
+                    print("✓ Article not modified, using cached copy")
+                    count('article_revalidated')
+                    self.article_cache.touch(url)
+                    return cached['html']
+
+                response.raise_for_status()
+                data = read_article(response, options)
+                content_type = response.headers.get('content-type')
+                etag = response.headers.get('etag')
+                last_modified = response.headers.get('last-modified')
+
+            count('article_bytes', len(data))
+            html_content = decode_article(data, content_type)
+            if self.article_cache is not None:
+                self.article_cache.put(url, html_content, etag, last_modified)
+            return html_content
+
+    def parse_article(self, html_content, url, options=None):
+        """Parse article HTML once, shared by image, metadata and content extraction
+
+        Parsed documents are kept in memory, so a page that comes back unchanged
+        (cache hit, 304) reuses its parse tree and distilled content.
+        """
+        options = options or self.options
+        key = make_key(
+            url, html_content, options.HTML_PARSER, options.MAX_ARTICLE_IMAGES, options.MAX_GENERAL_IMAGES,
+            options.DISTILL_CHARS_PER_TOKEN, options.DISTILL_MIN_BLOCK_LENGTH
+        )
+        document = self.document_cache.get(key)
+        if document is not None:
+            count('document_cache_hits')
+            return document
+
+        with timed('parse'):
+            document = ArticleDocument(html_content, url, options=options)
+        self.document_cache.put(key, document)
+        return document
 
     def extract_images_from_html(self, html_content, base_url):
-        """Extract all possible images from HTML using BeautifulSoup"""
-        soup = BeautifulSoup(html_content, 'html.parser')
-        image_urls = []
-
-        # Priority 1: Open Graph image
-        og_image = soup.find('meta', property='og:image')
-        if og_image and og_image.get('content'):
-            image_urls.append(og_image['content'])
-
-        # Priority 2: Twitter card image
-        twitter_image = soup.find('meta', attrs={'name': 'twitter:image'})
-        if twitter_image and twitter_image.get('content'):
-            image_urls.append(twitter_image['content'])
-
-        # Priority 3: Article images
-        article_imgs = soup.select('article img, .article img, .content img, .post-content img')
-        for img in article_imgs[:config.MAX_ARTICLE_IMAGES]:
-            if img.get('src'):
-                image_urls.append(img['src'])
-            elif img.get('data-src'):  # Lazy loaded images
-                image_urls.append(img['data-src'])
-
-        # Priority 4: All images with reasonable size attributes
-        all_imgs = soup.find_all('img')
-        for img in all_imgs[:config.MAX_GENERAL_IMAGES]:
-            if img.get('src'):
-                # Skip small images (icons, logos, etc)
-                width = img.get('width', '0')
-                height = img.get('height', '0')
-                try:
-                    if width and height:
-                        if int(width) > 200 and int(height) > 200:
-                            image_urls.append(img['src'])
-                    else:
-                        image_urls.append(img['src'])
-                except:
-                    image_urls.append(img['src'])
-
-        # Make URLs absolute
-        absolute_urls = []
-        for url in image_urls:
-            if url.startswith('http'):
-                absolute_urls.append(url)
-            else:
-                absolute_urls.append(urljoin(base_url, url))
-
-        # Remove duplicates while preserving order
-        seen = set()
-        unique_urls = []
-        for url in absolute_urls:
-            if url not in seen:
-                seen.add(url)
-                unique_urls.append(url)
-
-        return unique_urls
-
-    def extract_content_with_gemini(self, html_content, url, style="clickbait"):
+        """Extract all possible images from HTML (parses the page, prefer parse_article)"""
+        return self.parse_article(html_content, base_url).image_candidates()
+
+    def prepare_prompt_content(self, document, options=None):
+        """Distill article to main content within the token budget, or truncate raw HTML"""
+        options = options or self.options
+        if options.DISTILL_CONTENT:
+            with timed('distill'):
+                content = document.distill(options.MAX_CONTENT_TOKENS)
+            if len(content) >= options.DISTILL_MIN_LENGTH:
+                print(f"Distilled article: {len(document.html)} -> {len(content)} characters")
+                return content
+            print("Distilled content too short, falling back to raw HTML...")
+
+        # Truncate HTML if too long
+        html_content = document.html
+        if len(html_content) > options.MAX_HTML_LENGTH:
+            html_content = html_content[:options.MAX_HTML_LENGTH] + "..."
+        return html_content
+
+    def chat_completion(self, prompt, temperature, options=None):
+        """Send one prompt to Gemini, returns the response text"""
+        options = options or self.options
+        with timed('llm'):
+            response = self.client.chat.completions.create(
+                model=options.GEMINI_MODEL,
+                messages=[
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=temperature,
+            )
+
+        count('llm_calls')
+        if response.usage is not None:
+            count('prompt_tokens', response.usage.prompt_tokens or 0)
+            count('completion_tokens', response.usage.completion_tokens or 0)
+        return response.choices[0].message.content
+
+    def parse_json_response(self, result_text):
+        """Parse JSON object from model response, tolerating surrounding text"""
+        # Try to find JSON in the response
+        json_match = re.search(r'\{.*\}', result_text, re.DOTALL)
+        if json_match:
+            return json.loads(json_match.group())
+        return json.loads(result_text)
+
+    def extract_content_with_gemini(self, html_content, url, style="clickbait", document=None, options=None):
         """Use Gemini to extract article content, title, and image URL
 
         Args:
             html_content: HTML content of the article
             url: Article URL
             style: Headline style (clickbait, formal, casual, question, storytelling)
+            document: Already parsed ArticleDocument (optional, parsed if missing)
+            options: Options for this job (default: generator options)
         """
+        options = options or self.options
         print(f"Analyzing article content with Gemini (Style: {style})...")
 
-        # First extract images using BeautifulSoup
-        image_candidates = self.extract_images_from_html(html_content, url)
-        print(f"Found {len(image_candidates)} image candidates")
+        if document is None:
+            document = self.parse_article(html_content, url, options)
 
-        # Truncate HTML if too long
-        if len(html_content) > config.MAX_HTML_LENGTH:
-            html_content = html_content[:config.MAX_HTML_LENGTH] + "..."
+        # First extract images from the parsed document
+        image_candidates = document.image_candidates()
+        print(f"Found {len(image_candidates)} image candidates")
 
-        # Get style config
-        if style not in config.HEADLINE_STYLES:
-            print(f"Warning: Style '{style}' not found, using default")
-            style = config.DEFAULT_HEADLINE_STYLE
+        style, html_content, temperature, cache_key = self.style_request(document, url, style, options)
 
-        style_config = config.HEADLINE_STYLES[style]
+        # Return cached result for same content, URL, style, prompt, title length, model and temperature
+        cached = self.cached_style_result(cache_key, document)
+        if cached is not None:
+            return cached
 
         # Use prompt template from selected style
-        prompt = style_config["prompt"].format(
+        prompt = options.HEADLINE_STYLES[style]["prompt"].format(
             url=url,
             html_content=html_content,
-            max_title_length=config.MAX_TITLE_LENGTH
-        )
-
-        # Use temperature from style config
-        temperature = style_config.get("temperature", config.GEMINI_TEMPERATURE)
-
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {"role": "user", "content": prompt}
-            ],
-            temperature=temperature,
+            max_title_length=options.MAX_TITLE_LENGTH
         )
 
-        result_text = response.choices[0].message.content
+        result_text = self.chat_completion(prompt, temperature, options)
 
         # Extract JSON from response
         try:
-            # Try to find JSON in the response
-            json_match = re.search(r'\{.*\}', result_text, re.DOTALL)
-            if json_match:
-                result = json.loads(json_match.group())
-            else:
-                result = json.loads(result_text)
-
-            # Extract title from response (support multiple key names for compatibility)
-            result['title'] = result.get('title', result.get('clickbait_title', 'Berita Terkini'))
-            result['image_url'] = image_candidates[0] if image_candidates else None
-
-            # Extract source from AI response, fallback to domain if not provided
-            if 'source' not in result or not result['source']:
-                # Fallback to domain parsing
-                from urllib.parse import urlparse
-                parsed_url = urlparse(url)
-                result['source'] = parsed_url.netloc
-            else:
-                result['source'] = result['source']
-
+            return self.style_result(self.parse_json_response(result_text), document, url, cache_key)
         except json.JSONDecodeError as e:
             print(f"Failed to parse JSON: {e}")
             print(f"Response was: {result_text}")
-            # Fallback: parse domain from URL
-            from urllib.parse import urlparse
-            parsed_url = urlparse(url)
-            fallback_source = parsed_url.netloc
-
-            result = {
-                "title": "Berita Terkini yang Mengejutkan!",
-                "summary": "Baca berita selengkapnya",
-                "image_url": image_candidates[0] if image_candidates else None,
-                "source": fallback_source,
-            }
+            return self.fallback_style_result(document, url)
+
+    def style_request(self, document, url, style, options=None):
+        """Prompt inputs for one article in one headline style
+
+        Returns:
+            (style, content, temperature, cache_key), unknown styles are replaced by DEFAULT_HEADLINE_STYLE
+        """
+        options = options or self.options
+        content = self.prepare_prompt_content(document, options)
+
+        # Get style config
+        if style not in options.HEADLINE_STYLES:
+            print(f"Warning: Style '{style}' not found, using default")
+            style = options.DEFAULT_HEADLINE_STYLE
+
+        style_config = options.HEADLINE_STYLES[style]
+
+        # Use temperature from style config
+        temperature = style_config.get("temperature", options.GEMINI_TEMPERATURE)
+
+        # Everything filled into the prompt is part of the key
+        cache_key = make_key(content, url, style, style_config["prompt"], options.MAX_TITLE_LENGTH,
+                             options.GEMINI_MODEL, temperature)
+        return style, content, temperature, cache_key
+
+    def cached_style_result(self, cache_key, document):
+        """Cached Gemini result with image_url of document, None if not cached"""
+        if self.llm_cache is None:
+            return None
+        cached = self.llm_cache.get(cache_key)
+        count('llm_cache_hits' if cached is not None else 'llm_cache_misses')
+        if cached is None:
+            return None
+
+        print("✓ Using cached Gemini result")
+        image_candidates = document.image_candidates()
+        result = dict(cached)
+        result['image_url'] = image_candidates[0] if image_candidates else None
+        return result
+
+    def style_result(self, data, document, url, cache_key=None):
+        """Article data (title, summary, source, image_url) from one parsed Gemini answer
+
+        The result is cached under cache_key.
+        """
+        image_candidates = document.image_candidates()
+        result = dict(data)
+
+        # Extract title from response (support multiple key names for compatibility)
+        result['title'] = result.get('title', result.get('clickbait_title', 'Berita Terkini'))
+        result['image_url'] = image_candidates[0] if image_candidates else None
+
+        # Extract source from AI response, fallback to site name or domain if not provided
+        if 'source' not in result or not result['source']:
+            result['source'] = document.metadata()['site_name'] or urlparse(url).netloc
+
+        # Only successfully parsed responses are cached
+        if self.llm_cache is not None and cache_key is not None:
+            self.llm_cache.put(cache_key, {k: v for k, v in result.items() if k != 'image_url'})
 
         return result
 
-    def download_image(self, image_url):
-        """Download image from URL with validation"""
+    def fallback_style_result(self, document, url):
+        """Generic article data when Gemini gave no usable answer"""
+        image_candidates = document.image_candidates()
+        # Fallback: site name from page metadata, or domain from URL
+        fallback_source = document.metadata()['site_name'] or urlparse(url).netloc
+
+        return {
+            "title": "Berita Terkini yang Mengejutkan!",
+            "summary": "Baca berita selengkapnya",
+            "image_url": image_candidates[0] if image_candidates else None,
+            "source": fallback_source,
+        }
+
+    def extract_styles_with_gemini(self, document, url, styles, options=None):
+        """Generate headlines for several styles with a single Gemini call
+
+        Styles missing from the response fall back to one extract_content_with_gemini call each.
+
+        Returns:
+            Dict of style -> article data (title, summary, source, image_url)
+        """
+        options = options or self.options
+        styles = [style for style in styles if style in options.HEADLINE_STYLES]
+        print(f"Analyzing article content with Gemini (Styles: {', '.join(styles)})...")
+
+        image_candidates = document.image_candidates()
+        image_url = image_candidates[0] if image_candidates else None
+        html_content = self.prepare_prompt_content(document, options)
+
+        # Every style's own instructions, the article itself is only sent once above them
+        style_prompts = [options.HEADLINE_STYLES[style]['prompt'] for style in styles]
+        style_instructions = "\n\n".join(
+            f"=== GAYA {style} ({options.HEADLINE_STYLES[style]['name']}) ===\n"
+            + style_prompt.format(max_title_length=options.MAX_TITLE_LENGTH, **STYLE_PLACEHOLDERS)
+            for style, style_prompt in zip(styles, style_prompts)
+        )
+        prompt = options.MULTI_STYLE_PROMPT_TEMPLATE.format(
+            url=url,
+            html_content=html_content,
+            style_instructions=style_instructions,
+            max_title_length=options.MAX_TITLE_LENGTH
+        )
+        # One call has one temperature, the per-style temperatures cannot all apply
+        temperature = options.MULTI_STYLE_TEMPERATURE
+
+        cache_key = make_key(html_content, url, styles, style_prompts, options.MULTI_STYLE_PROMPT_TEMPLATE,
+                             options.MAX_TITLE_LENGTH, options.GEMINI_MODEL, temperature)
+        response_data = None
+        if self.llm_cache is not None:
+            response_data = self.llm_cache.get(cache_key)
+            count('llm_cache_hits' if response_data is not None else 'llm_cache_misses')
+
+        if response_data is not None:
+            print("✓ Using cached Gemini result")
+        else:
+            result_text = self.chat_completion(prompt, temperature, options)
+            try:
+                response_data = self.parse_json_response(result_text)
+                if self.llm_cache is not None:
+                    self.llm_cache.put(cache_key, response_data)
+            except json.JSONDecodeError as e:
+                print(f"Failed to parse JSON: {e}")
+                print(f"Response was: {result_text}")
+                response_data = {}
+
+        source = response_data.get('source') or document.metadata()['site_name'] or urlparse(url).netloc
+        style_titles = response_data.get('styles') or {}
+
+        results = {}
+        for style in styles:
+            style_data = style_titles.get(style)
+            if isinstance(style_data, str):
+                style_data = {'title': style_data}
+            if not style_data or not style_data.get('title'):
+                print(f"Style '{style}' missing from response, requesting it separately...")
+                results[style] = self.extract_content_with_gemini(
+                    document.html, url, style=style, document=document, options=options
+                )
+                continue
+
+            results[style] = {
+                'title': style_data['title'],
+                'summary': style_data.get('summary') or response_data.get('summary', ''),
+                'source': source,
+                'image_url': image_url,
+            }
+
+        return results
+
+    def download_image(self, image_url, cancel_event=None, options=None):
+        """Stream image from URL, rejecting non-images and small images from the header
+
+        Dimensions are checked as soon as the image header has arrived, so small
+        images are dropped without downloading the full body. The returned image
+        is not decoded yet, see image_ops.decode_for_cover.
+
+        Args:
+            image_url: Image URL
+            cancel_event: threading.Event, download stops when set (optional)
+            options: Options for this job (default: generator options)
+        """
+        options = options or self.options
         print(f"Downloading image from: {image_url}")
+        count('image_candidates_tried')
         headers = {
-            'User-Agent': config.USER_AGENT,
             'Referer': image_url
         }
 
-        try:
-            response = requests.get(image_url, headers=headers, timeout=config.REQUEST_TIMEOUT, allow_redirects=True)
-            response.raise_for_status()
-
-            # Validate it's actually an image
-            content_type = response.headers.get('content-type', '')
-            if 'image' not in content_type.lower():
-                print(f"Warning: URL doesn't appear to be an image (content-type: {content_type})")
-
-            img = Image.open(BytesIO(response.content))
+        # Revalidate a cached copy instead of downloading it again. A rejected image only counts
+        # while it is still too small for options, after MIN_IMAGE_* is lowered it is fetched in full
+        cached = self.image_cache.get(image_url) if self.image_cache is not None else None
+        if cached is not None and (
+            self.image_cache.open(cached) is not None if cached['hash'] is not None
+            else not self._entry_large_enough(cached, options)
+        ):
+            headers.update(self.image_cache.conditional_headers(cached))
+        else:
+            cached = None
 
-            # Validate image size
-            if img.width < config.MIN_IMAGE_WIDTH or img.height < config.MIN_IMAGE_HEIGHT:
-                print(f"Warning: Image too small ({img.width}x{img.height}), skipping...")
+        try:
+            with self.http.get(image_url, headers=headers, timeout=self.http_timeout,
+                               allow_redirects=True, stream=True) as response:
+                if response.status_code == 304 and cached is not None:
+                    print("✓ Image not modified, using cached copy")
+                    count('image_revalidated')
+                    self.image_cache.touch(image_url, cached)
+                    return self.open_cached_image(cached, options)
+
+                response.raise_for_status()
+                validators = (response.headers.get('etag'), response.headers.get('last-modified'))
+
+                # Drop responses that are clearly not images before reading the body
+                content_type = response.headers.get('content-type', '').lower()
+                if content_type.startswith('text/') or 'html' in content_type or 'json' in content_type:
+                    print(f"Warning: URL is not an image (content-type: {content_type}), skipping...")
+                    return None
+
+                # Buffer the body, image size is checked as soon as the header is readable
+                data = bytearray()
+                size_checked = False
+                for chunk in response.iter_content(options.IMAGE_STREAM_CHUNK_SIZE):
+                    if cancel_event is not None and cancel_event.is_set():
+                        return None
+                    data.extend(chunk)
+
+                    if not size_checked:
+                        header_img = self._open_image_header(data)
+                        if header_img is not None:
+                            if not self._is_large_enough(header_img, options):
+                                count('images_rejected')
+                                if self.image_cache is not None:
+                                    self.image_cache.put(image_url, None, *header_img.size, *validators)
+                                return None
+                            size_checked = True
+                        elif len(data) > options.IMAGE_HEADER_MAX_BYTES:
+                            print("Warning: No image header found, skipping...")
+                            count('images_rejected')
+                            return None
+
+            count('image_bytes', len(data))
+
+            # Opened lazily, decoding happens at render time at reduced resolution
+            data = bytes(data)
+            img = Image.open(BytesIO(data))
+            if not size_checked and not self._is_large_enough(img, options):
+                count('images_rejected')
+                if self.image_cache is not None:
+                    self.image_cache.put(image_url, None, *img.size, *validators)
                 return None
 
+            if self.image_cache is not None:
+                entry = self.image_cache.put(image_url, data, *img.size, *validators)
+                img.info['content_hash'] = entry['hash']
             return img
         except Exception as e:
             print(f"Error downloading image: {e}")
             return None
 
-    def create_default_image(self):
+    def open_cached_image(self, entry, options=None):
+        """Image of an image cache entry, None if it is too small for options or no longer stored"""
+        options = options or self.options
+        if not self._entry_large_enough(entry, options):
+            count('images_rejected')
+            return None
+        return self.image_cache.open(entry)
+
+    def _entry_large_enough(self, entry, options):
+        """Check an image cache entry against MIN_IMAGE_WIDTH/HEIGHT"""
+        return entry['width'] >= options.MIN_IMAGE_WIDTH and entry['height'] >= options.MIN_IMAGE_HEIGHT
+
+    def _open_image_header(self, data):
+        """Identify a (possibly partial) image from its header, None if not readable yet"""
+        try:
+            return Image.open(BytesIO(bytes(data)))
+        except Exception:
+            return None
+
+    def _is_large_enough(self, img, options=None):
+        """Check image against MIN_IMAGE_WIDTH/HEIGHT"""
+        options = options or self.options
+        if img.width < options.MIN_IMAGE_WIDTH or img.height < options.MIN_IMAGE_HEIGHT:
+            print(f"Warning: Image too small ({img.width}x{img.height}), skipping...")
+            return False
+        return True
+
+    def create_default_image(self, options=None):
         """Create a default background image if no image is found"""
+        options = options or self.options
         print("Creating default background image...")
         # Create a gradient background
-        img = Image.new('RGB', (config.IMAGE_WIDTH, config.IMAGE_HEIGHT), color='#1a1a1a')
+        img = Image.new('RGB', (options.IMAGE_WIDTH, options.IMAGE_HEIGHT), color='#1a1a1a')
         return img
 
-    def wrap_text(self, text, font, max_width):
-        """Wrap text to fit within max_width"""
-        words = text.split()
-        lines = []
-        current_line = []
-
-        for word in words:
-            current_line.append(word)
-            # Create a temporary draw object to measure text
-            temp_img = Image.new('RGB', (1, 1))
-            temp_draw = ImageDraw.Draw(temp_img)
-            line_text = ' '.join(current_line)
-            bbox = temp_draw.textbbox((0, 0), line_text, font=font)
-            line_width = bbox[2] - bbox[0]
-
-            if line_width > max_width:
-                if len(current_line) == 1:
-                    lines.append(current_line.pop())
-                else:
-                    current_line.pop()
-                    lines.append(' '.join(current_line))
-                    current_line = [word]
-
-        if current_line:
-            lines.append(' '.join(current_line))
-
-        return lines
-
-    def create_post_design_layout2(self, background_img, title, source_name, output_path, brand_text=None):
-        """Create post design with Layout 2 - Modern gradient overlay style"""
-        print("Creating post design (Layout 2 - Modern Gradient)...")
+    def cover_background(self, img, target_size, options=None):
+        """cover_resize, reusing the decoded frame of cached images from memory"""
+        options = options or self.options
+        key = self.image_cache.frame_key(img, target_size, options) if self.image_cache is not None else None
+        if key is not None:
+            frame = self.image_cache.get_frame(key)
+            if frame is not None:
+                count('frame_cache_hits')
+                return frame
+
+        frame = cover_resize(img, target_size, options)
+        if key is not None:
+            self.image_cache.put_frame(key, frame)
+        return frame
 
-        # Resize and crop background image to fill canvas
-        target_size = (config.IMAGE_WIDTH, config.IMAGE_HEIGHT)
-        img_ratio = background_img.width / background_img.height
-        target_ratio = target_size[0] / target_size[1]
+    def wrap_text(self, text, font, max_width):
+        """Wrap text to fit within max_width (cached word widths and layouts)"""
+        return wrap_text(text, font, max_width)
 
-        if img_ratio > target_ratio:
-            new_height = target_size[1]
-            new_width = int(new_height * img_ratio)
-        else:
-            new_width = target_size[0]
-            new_height = int(new_width / img_ratio)
+    def layout_title(self, title, max_width, options=None):
+        """Wrap title, shrinking the font to fit TITLE_MAX_LINES if set
 
-        background_img = background_img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+        Returns:
+            (title_font, wrapped_lines, line_height)
+        """
+        options = options or self.options
+        if not options.TITLE_MAX_LINES:
+            title_font = get_font(options.TITLE_FONT_PATH, options.TITLE_FONT_SIZE)
+            return title_font, self.wrap_text(title, title_font, max_width), options.LINE_HEIGHT
+
+        title_font, wrapped_lines = fit_text(
+            title,
+            options.TITLE_FONT_PATH,
+            options.TITLE_FONT_SIZE,
+            max_width,
+            options.TITLE_MAX_LINES,
+            options.TITLE_MIN_FONT_SIZE,
+            options.TITLE_FONT_SIZE_STEP
+        )
+        # Keep line spacing proportional to the chosen font size
+        font_size = getattr(title_font, 'size', options.TITLE_FONT_SIZE)
+        line_height = round(options.LINE_HEIGHT * font_size / options.TITLE_FONT_SIZE)
+        return title_font, wrapped_lines, line_height
+
+    def render_post_layout2(self, background_img, title, source_name, brand_text=None, options=None):
+        """Render post with Layout 2 - Modern gradient overlay style, returns RGB image"""
+        options = options or self.options
+        print("Creating post design (Layout 2 - Modern Gradient)...")
 
-        # Crop to center
-        left = (new_width - target_size[0]) // 2
-        top = (new_height - target_size[1]) // 2
-        background_img = background_img.crop((left, top, left + target_size[0], top + target_size[1]))
+        # Resize and crop background image to fill canvas
+        target_size = (options.IMAGE_WIDTH, options.IMAGE_HEIGHT)
+        with timed('resize'):
+            background_img = self.cover_background(background_img, target_size, options)
 
         # Convert to RGBA for overlay support
         background_img = background_img.convert('RGBA')
@@ -284,20 +630,15 @@ class HeadlineGenerator:
         overlay = Image.new('RGBA', target_size, (0, 0, 0, 0))
         draw = ImageDraw.Draw(overlay)
 
-        # Load fonts
-        try:
-            title_font = ImageFont.truetype(config.TITLE_FONT_PATH, config.TITLE_FONT_SIZE)
-            source_font = ImageFont.truetype(config.SOURCE_FONT_PATH, config.SOURCE_FONT_SIZE)
-        except:
-            title_font = ImageFont.load_default()
-            source_font = ImageFont.load_default()
+        # Load fonts (cached per process)
+        source_font = get_font(options.SOURCE_FONT_PATH, options.SOURCE_FONT_SIZE)
 
         # 1. Draw source logo/text at top right
         if source_name:
             source_bbox = draw.textbbox((0, 0), source_name, font=source_font)
             source_width = source_bbox[2] - source_bbox[0]
-            source_x = config.IMAGE_WIDTH - source_width - config.LAYOUT2_BADGE_MARGIN
-            source_y = config.LAYOUT2_BADGE_MARGIN
+            source_x = options.IMAGE_WIDTH - source_width - options.LAYOUT2_BADGE_MARGIN
+            source_y = options.LAYOUT2_BADGE_MARGIN
 
             draw.text(
                 (source_x, source_y),
@@ -307,44 +648,36 @@ class HeadlineGenerator:
             )
 
         # 2. Draw gradient overlay at bottom (taller and more opaque)
-        gradient_height = config.LAYOUT2_GRADIENT_HEIGHT
-        for i in range(gradient_height):
-            # Create gradient from transparent to dark
-            # More aggressive gradient curve for better opacity at top
-            progress = i / gradient_height
-            # Use power curve for more opacity earlier
-            alpha = int((progress ** 0.7) * config.LAYOUT2_GRADIENT_COLOR[3])
-            color = (config.LAYOUT2_GRADIENT_COLOR[0],
-                    config.LAYOUT2_GRADIENT_COLOR[1],
-                    config.LAYOUT2_GRADIENT_COLOR[2],
-                    alpha)
-            y_pos = config.IMAGE_HEIGHT - gradient_height + i
-            draw.line([(0, y_pos), (config.IMAGE_WIDTH, y_pos)], fill=color, width=1)
+        # Precomputed once per size/color, pasted in one operation
+        gradient_height = options.LAYOUT2_GRADIENT_HEIGHT
+        gradient = get_gradient_layer(options.IMAGE_WIDTH, gradient_height, options.LAYOUT2_GRADIENT_COLOR)
+        overlay.paste(gradient, (0, options.IMAGE_HEIGHT - gradient_height))
 
         # 3. Draw headline text at bottom over gradient (positioned higher)
-        max_width = config.IMAGE_WIDTH - (config.BOX_MARGIN * 2)
-        wrapped_lines = self.wrap_text(title, title_font, max_width)
+        max_width = options.IMAGE_WIDTH - (options.BOX_MARGIN * 2)
+        with timed('text_layout'):
+            title_font, wrapped_lines, line_height = self.layout_title(title, max_width, options)
 
         # Calculate total text height
-        total_height = len(wrapped_lines) * config.LINE_HEIGHT
+        total_height = len(wrapped_lines) * line_height
         # Position text higher up in the gradient area
-        start_y = config.IMAGE_HEIGHT - gradient_height + 80
+        start_y = options.IMAGE_HEIGHT - gradient_height + 80
 
         # Draw each line
         for i, line in enumerate(wrapped_lines):
-            y = start_y + (i * config.LINE_HEIGHT)
+            y = start_y + (i * line_height)
             draw.text(
-                (config.BOX_MARGIN, y),
+                (options.BOX_MARGIN, y),
                 line,
-                fill=config.LAYOUT2_TEXT_COLOR,
+                fill=options.LAYOUT2_TEXT_COLOR,
                 font=title_font
             )
 
         # 4. Optional: Draw brand text at bottom left if provided
         if brand_text:
-            brand_y = config.IMAGE_HEIGHT - config.BOX_MARGIN - 10
+            brand_y = options.IMAGE_HEIGHT - options.BOX_MARGIN - 10
             draw.text(
-                (config.BOX_MARGIN, brand_y),
+                (options.BOX_MARGIN, brand_y),
                 brand_text,
                 fill=(255, 255, 255, 200),
                 font=source_font
@@ -353,51 +686,32 @@ class HeadlineGenerator:
         # Composite overlay onto background
         background_img = Image.alpha_composite(background_img, overlay)
 
-        # Convert to RGB and save
-        background_img = background_img.convert('RGB')
-        background_img.save(output_path, config.OUTPUT_FORMAT, quality=config.OUTPUT_QUALITY)
-        print(f"Post saved to: {output_path}")
+        # Convert to RGB
+        return background_img.convert('RGB')
 
-    def create_post_design(self, background_img, title, source_name, output_path, brand_text=None, layout="layout1"):
-        """Create the final post design with AI-extracted source name
+    def render_post(self, background_img, title, source_name, brand_text=None, layout="layout1", options=None):
+        """Render the post design in memory, returns RGB image
 
         Args:
             layout: "layout1" (white box) or "layout2" (news update)
+            options: Options for this job (default: generator options)
         """
+        options = options or self.options
+
         # Route to appropriate layout
         if layout == "layout2":
-            return self.create_post_design_layout2(background_img, title, source_name, output_path, brand_text)
+            return self.render_post_layout2(background_img, title, source_name, brand_text, options)
 
         # Default: Layout 1 (original white box design)
         print("Creating post design (Layout 1 - White Box)...")
 
-        # Resize and crop background image
-        target_size = (config.IMAGE_WIDTH, config.IMAGE_HEIGHT)
+        # Resize and crop background image to cover the entire canvas
+        target_size = (options.IMAGE_WIDTH, options.IMAGE_HEIGHT)
+        with timed('resize'):
+            background_img = self.cover_background(background_img, target_size, options)
 
-        # Calculate resize ratio to cover the entire canvas
-        img_ratio = background_img.width / background_img.height
-        target_ratio = target_size[0] / target_size[1]
-
-        if img_ratio > target_ratio:
-            # Image is wider, fit by height
-            new_height = target_size[1]
-            new_width = int(new_height * img_ratio)
-        else:
-            # Image is taller, fit by width
-            new_width = target_size[0]
-            new_height = int(new_width / img_ratio)
-
-        background_img = background_img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-
-        # Crop to center
-        left = (new_width - target_size[0]) // 2
-        top = (new_height - target_size[1]) // 2
-        right = left + target_size[0]
-        bottom = top + target_size[1]
-        background_img = background_img.crop((left, top, right, bottom))
-
-        # Create a semi-transparent overlay
-        overlay = Image.new('RGBA', target_size, config.OVERLAY_COLOR)
+        # Semi-transparent overlay (cached per size/color)
+        overlay = get_solid_overlay(target_size, options.OVERLAY_COLOR)
         background_img = background_img.convert('RGBA')
         background_img = Image.alpha_composite(background_img, overlay)
 
@@ -405,50 +719,43 @@ class HeadlineGenerator:
         draw = ImageDraw.Draw(background_img)
 
         # Box dimensions from config
-        box_left = config.BOX_MARGIN
-        box_right = target_size[0] - config.BOX_MARGIN
+        box_left = options.BOX_MARGIN
+        box_right = target_size[0] - options.BOX_MARGIN
         box_width = box_right - box_left
 
-        # Try to load fonts, fallback to default if not available
-        try:
-            title_font = ImageFont.truetype(config.TITLE_FONT_PATH, config.TITLE_FONT_SIZE)
-            source_font = ImageFont.truetype(config.SOURCE_FONT_PATH, config.SOURCE_FONT_SIZE)
-        except:
-            print("Custom fonts not found, using default...")
-            title_font = ImageFont.load_default()
-            source_font = ImageFont.load_default()
+        # Load fonts (cached per process, fallback to default if not available)
+        source_font = get_font(options.SOURCE_FONT_PATH, options.SOURCE_FONT_SIZE)
 
         # Wrap title text
-        text_max_width = box_width - (config.BOX_PADDING * 2)
-        wrapped_lines = self.wrap_text(title, title_font, text_max_width)
+        text_max_width = box_width - (options.BOX_PADDING * 2)
+        with timed('text_layout'):
+            title_font, wrapped_lines, line_height = self.layout_title(title, text_max_width, options)
 
         # Calculate text height
-        temp_img = Image.new('RGB', (1, 1))
-        temp_draw = ImageDraw.Draw(temp_img)
-        total_text_height = len(wrapped_lines) * config.LINE_HEIGHT
+        total_text_height = len(wrapped_lines) * line_height
 
         # Position white box in lower third
-        box_height = total_text_height + (config.BOX_PADDING * 2) + 80  # Extra space for source
-        box_top = target_size[1] - box_height - config.BOX_MARGIN - 60
+        box_height = total_text_height + (options.BOX_PADDING * 2) + 80  # Extra space for source
+        box_top = target_size[1] - box_height - options.BOX_MARGIN - 60
         box_bottom = box_top + box_height
 
         # Draw white box with rounded corners
         draw.rounded_rectangle(
             [box_left, box_top, box_right, box_bottom],
-            radius=config.BOX_RADIUS,
-            fill=config.WHITE_BOX_COLOR
+            radius=options.BOX_RADIUS,
+            fill=options.WHITE_BOX_COLOR
         )
 
         # Draw text
-        y_position = box_top + config.BOX_PADDING
+        y_position = box_top + options.BOX_PADDING
         for line in wrapped_lines:
             draw.text(
-                (box_left + config.BOX_PADDING, y_position),
+                (box_left + options.BOX_PADDING, y_position),
                 line,
-                fill=config.TEXT_COLOR,
+                fill=options.TEXT_COLOR,
                 font=title_font
             )
-            y_position += config.LINE_HEIGHT
+            y_position += line_height
 
         # Conditional positioning based on SHOW_SOURCE and brand_text
         # Logic:
@@ -456,29 +763,29 @@ class HeadlineGenerator:
         # - Source OFF + Brand ON = Brand kanan bawah
         # - Source ON + Brand OFF = Source kanan bawah
 
-        bottom_y = box_bottom - config.BOX_PADDING - 30
+        bottom_y = box_bottom - options.BOX_PADDING - 30
 
-        if config.SHOW_SOURCE:
+        if options.SHOW_SOURCE:
             # Show source attribution (AI-extracted source name, not domain)
-            source_text = f"{config.SOURCE_TEXT}: {source_name}"
+            source_text = f"{options.SOURCE_TEXT}: {source_name}"
             source_bbox = draw.textbbox((0, 0), source_text, font=source_font)
             source_width = source_bbox[2] - source_bbox[0]
-            source_x = box_right - config.BOX_PADDING - source_width
+            source_x = box_right - options.BOX_PADDING - source_width
 
             draw.text(
                 (source_x, bottom_y),
                 source_text,
-                fill=config.SOURCE_COLOR,
+                fill=options.SOURCE_COLOR,
                 font=source_font
             )
 
             # If brand text provided, show at bottom left
             if brand_text:
-                brand_x = box_left + config.BOX_PADDING
+                brand_x = box_left + options.BOX_PADDING
                 draw.text(
                     (brand_x, bottom_y),
                     brand_text,
-                    fill=config.BRAND_COLOR,
+                    fill=options.BRAND_COLOR,
                     font=source_font
                 )
 
@@ -488,23 +795,238 @@ class HeadlineGenerator:
                 # Brand text takes the right position (where source would be)
                 brand_bbox = draw.textbbox((0, 0), brand_text, font=source_font)
                 brand_width = brand_bbox[2] - brand_bbox[0]
-                brand_x = box_right - config.BOX_PADDING - brand_width
+                brand_x = box_right - options.BOX_PADDING - brand_width
 
                 draw.text(
                     (brand_x, bottom_y),
                     brand_text,
-                    fill=config.BRAND_COLOR,
+                    fill=options.BRAND_COLOR,
                     font=source_font
                 )
 
-        # Convert back to RGB and save
-        background_img = background_img.convert('RGB')
-        background_img.save(output_path, config.OUTPUT_FORMAT, quality=config.OUTPUT_QUALITY)
-        print(f"Post saved to: {output_path}")
+        # Convert back to RGB
+        return background_img.convert('RGB')
+
+    def create_post_design_layout2(self, background_img, title, source_name, output_path, brand_text=None,
+                                   output_format=None, options=None):
+        """Create post design with Layout 2 and save it to output_path"""
+        return self.create_post_design(
+            background_img, title, source_name, output_path, brand_text, "layout2", output_format, options
+        )
+
+    def create_post_design(self, background_img, title, source_name, output_path, brand_text=None, layout="layout1",
+                           output_format=None, options=None):
+        """Create the final post design with AI-extracted source name and save it
+
+        Args:
+            output_path: File path or writable binary stream
+            layout: "layout1" (white box) or "layout2" (news update)
+            output_format: PNG, JPEG or WEBP (default: from output_path extension, then OUTPUT_FORMAT)
+            options: Options for this job (default: generator options)
+        """
+        options = options or self.options
+        with timed('render'):
+            post_img = self.render_post(background_img, title, source_name, brand_text, layout, options)
+        with timed('encode'):
+            save_image(post_img, output_path, output_format, options)
+        if isinstance(output_path, str):
+            print(f"Post saved to: {output_path}")
+
+    def find_background_image(self, image_candidates, options=None):
+        """Probe image candidates in parallel, fallback to default background
+
+        The first acceptable candidate in priority order wins, remaining probes are cancelled.
+        """
+        options = options or self.options
+        background_img = None
+        candidates = image_candidates[:options.MAX_IMAGE_CANDIDATES]
+
+        # Candidates cached within IMAGE_CACHE_FRESH are settled in priority order without
+        # the network, probing starts at the first candidate that is not
+        while candidates and self.image_cache is not None:
+            entry = self.image_cache.get(candidates[0], max_age=options.IMAGE_CACHE_FRESH)
+            if entry is None:
+                break
+            background_img = self.open_cached_image(entry, options)
+            if background_img is not None:
+                print(f"✓ Using cached image: {candidates[0]}")
+                count('image_cache_hits')
+                return background_img
+            if self._entry_large_enough(entry, options):
+                # Large enough now, but its bytes were evicted or it was rejected under
+                # stricter MIN_IMAGE_* settings, download it again
+                break
+            candidates = candidates[1:]
+
+        if candidates:
+            print(f"\nProbing {len(candidates)} image candidates in parallel...")
+            cancel_event = threading.Event()
+            # Probes run in the image pool, each gets a copy of this context to record into the job trace
+            futures = [
+                self.image_pool.submit(contextvars.copy_context().run,
+                                       self.download_image, img_url, cancel_event, options)
+                for img_url in candidates
+            ]
+            try:
+                with timed('image_probe'):
+                    for i, future in enumerate(futures, 1):
+                        background_img = future.result()
+                        if background_img:
+                            print(f"✓ Successfully downloaded image from candidate {i}")
+                            break
+            finally:
+                cancel_event.set()
+                for future in futures:
+                    future.cancel()
+
+        if not background_img:
+            print("\nNo valid images found, using default background...")
+            background_img = self.create_default_image(options)
+
+        return background_img
+
+    def build_output_path(self, title, output_filename=None, suffix=None, output_format=None, options=None):
+        """Build output path from custom filename or sanitized title
+
+        Args:
+            suffix: Appended to the generated filename, e.g. "formal_layout2" for variants
+            output_format: Picks the extension of the generated filename (default: OUTPUT_FORMAT)
+        """
+        if not output_filename:
+            safe_title = re.sub(r'[^\w\s-]', '', title)[:50]
+            safe_title = re.sub(r'[-\s]+', '-', safe_title)
+            if suffix:
+                safe_title = f"{safe_title}_{suffix}"
+            output_filename = f"post_{safe_title}{extension(output_format, options or self.options)}"
+
+        return os.path.join(config.OUTPUT_DIR, output_filename)
+
+    def record_post(self, output_path, url, style, layout, article_data, fingerprint=None):
+        """Record a written post in the gallery index, with its thumbnail"""
+        try:
+            with timed('index'):
+                self._record_post(output_path, url, style, layout, article_data, fingerprint)
+        except Exception as e:
+            # The post itself was written, indexing problems must not fail generation
+            print(f"Warning: could not index post: {e}")
+
+    def _record_post(self, output_path, url, style, layout, article_data, fingerprint=None):
+        index = get_post_index()
+        previous = index.get(os.path.basename(output_path))
+
+        thumbnail = create_thumbnail(output_path) if config.THUMBNAIL_ON_RENDER else None
+        index.record(
+            output_path,
+            url=url,
+            style=style,
+            layout=layout,
+            title=article_data.get('title'),
+            source=article_data.get('source'),
+            thumbnail=thumbnail,
+            fingerprint=fingerprint
+        )
+
+        # A regenerated post gets a new content-hash thumbnail, drop the old one
+        if previous and previous['thumbnail'] != thumbnail:
+            remove_thumbnail(previous['thumbnail'])
+
+    def job_options(self, show_source=None, options=None):
+        """Options for one job: options (default: generator options) with per-job overrides"""
+        return (options or self.options).replace(SHOW_SOURCE=show_source)
+
+    def job_fingerprint(self, url, style, layout, brand_text, output_format, options):
+        """Key of everything that determines a post, identical jobs have the same fingerprint
+
+        options already carries show_source (see job_options), its version covers every setting.
+        """
+        return make_key(url, style, layout, brand_text, normalize_format(output_format, options), options.version())
+
+    def find_existing_post(self, fingerprint, options=None):
+        """Path of a post made by an identical job that is still on disk, None if there is none"""
+        options = options or self.options
+        if not options.IDEMPOTENT_JOBS:
+            return None
+        row = get_post_index().find(fingerprint, max_age=options.IDEMPOTENT_JOBS_MAX_AGE)
+        if row is None:
+            return None
+        output_path = os.path.join(config.OUTPUT_DIR, row['filename'])
+        return output_path if os.path.exists(output_path) else None
+
+    def _join_inflight(self, fingerprint):
+        """(future, owner): owner is True when the caller must generate and resolve future"""
+        with self._inflight_lock:
+            future = self._inflight.get(fingerprint)
+            if future is not None:
+                return future, False
+            future = self._inflight[fingerprint] = Future()
+            return future, True
+
+    def _leave_inflight(self, fingerprint):
+        with self._inflight_lock:
+            self._inflight.pop(fingerprint, None)
+
+    def prepare_post(self, url, brand_text=None, style="clickbait", show_source=None, layout="layout1", progress=None,
+                     options=None):
+        """Fetch, analyze and render a post in memory
+
+        Args: see generate_post
+
+        Returns:
+            (post_img, article_data) with post_img an RGB image
+        """
+        if progress is None:
+            progress = lambda stage: None
+
+        # Get brand text from parameter, environment variable, or None
+        if brand_text is None:
+            brand_text = os.getenv("BRAND_TEXT", None)
+
+        # Per-job snapshot, config module is never modified
+        options = self.job_options(show_source, options)
+
+        # Fetch article and parse it once
+        progress('fetch')
+        html_content = self.fetch_article_content(url, options)
+        document = self.parse_article(html_content, url, options)
+
+        # Extract content with Gemini using selected style
+        progress('analyze')
+        article_data = self.extract_content_with_gemini(
+            html_content, url, style=style, document=document, options=options
+        )
+
+        print(f"\nExtracted data:")
+        print(f"Title: {article_data['title']}")
+        print(f"Summary: {article_data.get('summary', 'N/A')}")
+        print(f"Source: {article_data.get('source', 'N/A')}")
+
+        # Get source from AI extraction (Gemini determines the source name)
+        source_name = article_data.get('source', 'Unknown Source')
+
+        # Get all image candidates and download the first valid one
+        progress('image')
+        image_candidates = document.image_candidates()
+        background_img = self.find_background_image(image_candidates, options)
+
+        # Create the design (using AI-extracted source name)
+        progress('render')
+        with timed('render'):
+            post_img = self.render_post(
+                background_img,
+                article_data['title'],
+                source_name,
+                brand_text=brand_text,
+                layout=layout,
+                options=options
+            )
+        return post_img, article_data
 
-    def generate_post(self, url, output_filename=None, brand_text=None, style="clickbait", show_source=None, layout="layout1"):
+    def generate_post(self, url, output_filename=None, brand_text=None, style="clickbait", show_source=None, layout="layout1",
+                      progress=None, output_format=None, options=None, trace=None):
         """Main method to generate post from URL
 
+        Safe to call from several threads at once, each call only uses its own options.
+
         Args:
             url: Article URL
             output_filename: Custom output filename (optional)
@@ -512,80 +1034,194 @@ class HeadlineGenerator:
             style: Headline style - clickbait, formal, casual, question, storytelling
             show_source: Override SHOW_SOURCE config (True/False/None for default)
             layout: Layout style - "layout1" (white box) or "layout2" (news update)
+            progress: Callback called with each stage name - fetch, analyze, image, render (optional)
+            output_format: PNG, JPEG or WEBP (default: OUTPUT_FORMAT)
+            options: Options snapshot for this job (default: generator options)
+            trace: metrics.Trace that collects stage timings and counters (optional)
+
+        With IDEMPOTENT_JOBS, a job identical to one already done returns the
+        existing post, and identical jobs running at the same time are generated once.
         """
+        trace = trace or Trace()
+        status = 'error'
+        fingerprint = None
+        inflight = None
+        owner = False
         try:
-            # Get brand text from parameter, environment variable, or None
-            if brand_text is None:
-                brand_text = os.getenv("BRAND_TEXT", None)
-
-            # Override show_source if specified
-            original_show_source = config.SHOW_SOURCE
-            if show_source is not None:
-                config.SHOW_SOURCE = show_source
-
-            # Fetch article
-            html_content = self.fetch_article_content(url)
-
-            # Extract content with Gemini using selected style
-            article_data = self.extract_content_with_gemini(html_content, url, style=style)
-
-            print(f"\nExtracted data:")
-            print(f"Title: {article_data['title']}")
-            print(f"Summary: {article_data.get('summary', 'N/A')}")
-            print(f"Source: {article_data.get('source', 'N/A')}")
-
-            # Get source from AI extraction (Gemini determines the source name)
-            source_name = article_data.get('source', 'Unknown Source')
-
-            # Try to download image from candidates
-            background_img = None
-
-            # Get all image candidates
-            image_candidates = self.extract_images_from_html(html_content, url)
-
-            if image_candidates:
-                print(f"\nTrying {len(image_candidates)} image candidates...")
-                for i, img_url in enumerate(image_candidates[:config.MAX_IMAGE_CANDIDATES], 1):
-                    print(f"Attempt {i}/{min(config.MAX_IMAGE_CANDIDATES, len(image_candidates))}: {img_url[:80]}...")
-                    background_img = self.download_image(img_url)
-                    if background_img:
-                        print(f"✓ Successfully downloaded image from candidate {i}")
-                        break
-
-            if not background_img:
-                print("\nNo valid images found, using default background...")
-                background_img = self.create_default_image()
-
-            # Generate output filename
-            if not output_filename:
-                safe_title = re.sub(r'[^\w\s-]', '', article_data['title'])[:50]
-                safe_title = re.sub(r'[-\s]+', '-', safe_title)
-                output_filename = f"post_{safe_title}.png"
-
-            output_path = os.path.join(config.OUTPUT_DIR, output_filename)
-
-            # Create the design (using AI-extracted source name)
-            self.create_post_design(
-                background_img,
-                article_data['title'],
-                source_name,
-                output_path,
-                brand_text=brand_text,
-                layout=layout
-            )
-
-            # Restore original config
-            if show_source is not None:
-                config.SHOW_SOURCE = original_show_source
+            with trace.activate(), trace.stage('total'):
+                options = self.job_options(show_source, options)
+                if brand_text is None:
+                    brand_text = os.getenv("BRAND_TEXT", None)
+
+                # A custom output filename asks for that file, only generated names are reused
+                if options.IDEMPOTENT_JOBS and not output_filename:
+                    fingerprint = self.job_fingerprint(url, style, layout, brand_text, output_format, options)
+                    existing = self.find_existing_post(fingerprint, options)
+                    if existing:
+                        print(f"✓ Identical job already done: {existing}")
+                        count('duplicate_jobs')
+                        status = 'duplicate'
+                        return existing
+
+                    inflight, owner = self._join_inflight(fingerprint)
+                    if not owner:
+                        print("Identical job in progress, waiting for it...")
+                        count('coalesced_jobs')
+                        output_path = inflight.result()
+                        status = 'duplicate'
+                        return output_path
+
+                post_img, article_data = self.prepare_post(
+                    url, brand_text, style, layout=layout, progress=progress, options=options
+                )
 
+                output_path = self.build_output_path(
+                    article_data['title'], output_filename, output_format=output_format, options=options
+                )
+                with timed('encode'):
+                    save_image(post_img, output_path, output_format, options)
+                print(f"Post saved to: {output_path}")
+                self.record_post(output_path, url, style, layout, article_data, fingerprint)
+
+            if owner:
+                inflight.set_result(output_path)
+            status = 'ok'
             return output_path
 
         except Exception as e:
-            # Restore original config even on error
-            if show_source is not None:
-                config.SHOW_SOURCE = original_show_source
+            if owner:
+                inflight.set_exception(e)
             print(f"Error generating post: {e}")
             raise
+        finally:
+            if owner:
+                self._leave_inflight(fingerprint)
+            registry.observe(trace, status)
+
+    def generate_post_bytes(self, url, stream=None, brand_text=None, style="clickbait", show_source=None, layout="layout1",
+                            progress=None, output_format=None, options=None, trace=None):
+        """Generate post from URL without writing to OUTPUT_DIR
+
+        Args:
+            stream: Writable binary stream to encode into (optional)
+            Other args: see generate_post
+
+        Returns:
+            (data, output_format, article_data) where data is the encoded image,
+            or None when it was written to stream
+        """
+        trace = trace or Trace()
+        status = 'error'
+        try:
+            with trace.activate(), trace.stage('total'):
+                options = self.job_options(show_source, options)
+                post_img, article_data = self.prepare_post(
+                    url, brand_text, style, layout=layout, progress=progress, options=options
+                )
+
+                buffer = stream if stream is not None else BytesIO()
+                with timed('encode'):
+                    output_format = save_image(post_img, buffer, output_format, options)
+                data = buffer.getvalue() if stream is None else None
+
+            status = 'ok'
+            return data, output_format, article_data
+
+        except Exception as e:
+            print(f"Error generating post: {e}")
+            raise
+        finally:
+            registry.observe(trace, status)
+
+    def save_post_bytes(self, data, url, article_data, style="clickbait", layout="layout1", output_format=None):
+        """Write an encoded post from generate_post_bytes to OUTPUT_DIR and index it
+
+        Returns:
+            Output path
+        """
+        output_path = self.build_output_path(article_data['title'], output_format=output_format)
+
+        # Write under a temporary name so the gallery never serves a partial file
+        tmp_path = f"{output_path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, output_path)
+
+        print(f"Post saved to: {output_path}")
+        self.record_post(output_path, url, style, layout, article_data)
+        return output_path
+
+    def generate_post_variants(self, url, styles=None, layouts=None, brand_text=None, show_source=None,
+                               output_format=None, options=None, trace=None):
+        """Generate every style/layout combination from one fetch and one Gemini call
+
+        Args:
+            url: Article URL
+            styles: Headline styles (default: all HEADLINE_STYLES)
+            layouts: Layouts (default: all AVAILABLE_LAYOUTS)
+            brand_text: Brand text for bottom left (optional)
+            show_source: Override SHOW_SOURCE config (True/False/None for default)
+            output_format: PNG, JPEG or WEBP (default: OUTPUT_FORMAT)
+            options: Options snapshot for this job (default: generator options)
+            trace: metrics.Trace that collects stage timings and counters (optional)
+
+        Returns:
+            List of dicts with style, layout, title and output_path
+        """
+        options = self.job_options(show_source, options)
+        styles = styles or list(options.HEADLINE_STYLES)
+        layouts = layouts or list(options.AVAILABLE_LAYOUTS)
+
+        if brand_text is None:
+            brand_text = os.getenv("BRAND_TEXT", None)
+
+        trace = trace or Trace()
+        status = 'error'
+        try:
+            with trace.activate(), trace.stage('total'):
+                # Fetch and parse once
+                html_content = self.fetch_article_content(url, options)
+                document = self.parse_article(html_content, url, options)
+
+                # One Gemini call for all styles
+                style_data = self.extract_styles_with_gemini(document, url, styles, options)
+
+                # One background download, decoded by the first render and reused by the others
+                background_img = self.find_background_image(document.image_candidates(), options)
+
+                variants = []
+                for style, article_data in style_data.items():
+                    print(f"\n[{style}] {article_data['title']}")
+                    for layout in layouts:
+                        output_path = self.build_output_path(
+                            article_data['title'], suffix=f"{style}_{layout}", output_format=output_format, options=options
+                        )
+                        self.create_post_design(
+                            background_img,
+                            article_data['title'],
+                            article_data.get('source', 'Unknown Source'),
+                            output_path,
+                            brand_text=brand_text,
+                            layout=layout,
+                            output_format=output_format,
+                            options=options
+                        )
+                        self.record_post(output_path, url, style, layout, article_data)
+                        variants.append({
+                            'style': style,
+                            'layout': layout,
+                            'title': article_data['title'],
+                            'output_path': output_path,
+                        })
+
+            status = 'ok'
+            return variants
+
+        except Exception as e:
+            print(f"Error generating post variants: {e}")
+            raise
+        finally:
+            registry.observe(trace, status)
 
 
 def main():
@@ -605,10 +1241,14 @@ Examples:
   python headline_generator.py https://example.com/article --style formal --hide-source
   python headline_generator.py https://example.com/article --layout layout2
   python headline_generator.py https://example.com/article --style clickbait --layout layout2
+  python headline_generator.py --batch urls.txt --style formal
+  cat urls.txt | python headline_generator.py --batch - --llm-workers 8
+  python headline_generator.py https://example.com/article --all-styles --all-layouts
+  python headline_generator.py https://example.com/article --format webp
         """
     )
 
-    parser.add_argument('url', help='Article URL to generate post from')
+    parser.add_argument('url', nargs='?', help='Article URL to generate post from')
     parser.add_argument('-o', '--output', dest='output_filename',
                         help='Output filename (optional)')
     parser.add_argument('-b', '--brand', dest='brand_text',
@@ -621,15 +1261,39 @@ Examples:
                         choices=['layout1', 'layout2'],
                         default='layout1',
                         help='Layout style: layout1 (white box) or layout2 (news update)')
+    parser.add_argument('-f', '--format', dest='output_format',
+                        choices=['png', 'jpeg', 'webp'],
+                        help=f'Output format (default: {config.OUTPUT_FORMAT.lower()})')
     parser.add_argument('--hide-source', dest='hide_source',
                         action='store_true',
                         help='Hide source attribution (overrides config)')
     parser.add_argument('--show-source', dest='show_source',
                         action='store_true',
                         help='Show source attribution (overrides config)')
+    parser.add_argument('--batch', dest='batch_file', metavar='FILE',
+                        help='File with one article URL per line ("-" for stdin)')
+    parser.add_argument('--io-workers', dest='io_workers', type=int,
+                        help=f'Batch: fetch/download workers (default: {config.BATCH_IO_WORKERS})')
+    parser.add_argument('--llm-workers', dest='llm_workers', type=int,
+                        help=f'Batch: concurrent Gemini calls (default: {config.BATCH_LLM_WORKERS})')
+    parser.add_argument('--render-workers', dest='render_workers', type=int,
+                        help=f'Batch: render workers (default: {config.BATCH_RENDER_WORKERS})')
+    parser.add_argument('--llm-batch', dest='llm_batch_size', type=int,
+                        help=f'Batch: articles per Gemini request, 1 = no batching (default: {config.LLM_BATCH_SIZE})')
+    parser.add_argument('--all-styles', dest='all_styles', action='store_true',
+                        help='Generate every headline style from one fetch and one Gemini call')
+    parser.add_argument('--all-layouts', dest='all_layouts', action='store_true',
+                        help='Render every layout from the same background image')
 
     args = parser.parse_args()
 
+    if not args.url and not args.batch_file:
+        parser.error('either url or --batch is required')
+    if args.url and args.batch_file:
+        parser.error('url and --batch cannot be used together')
+    if args.batch_file and (args.all_styles or args.all_layouts):
+        parser.error('--all-styles/--all-layouts cannot be used with --batch')
+
     # Determine show_source value
     show_source_override = None
     if args.hide_source:
@@ -646,16 +1310,62 @@ Examples:
     print()
 
     generator = HeadlineGenerator()
+
+    if args.batch_file:
+        from batch import BatchGenerator, read_urls
+
+        urls = read_urls(args.batch_file)
+        print(f"Batch: {len(urls)} articles\n")
+        batch = BatchGenerator(
+            generator,
+            io_workers=args.io_workers,
+            llm_workers=args.llm_workers,
+            render_workers=args.render_workers,
+            llm_batch_size=args.llm_batch_size
+        )
+        results = batch.run(
+            urls,
+            brand_text=args.brand_text,
+            style=args.style,
+            show_source=show_source_override,
+            layout=args.layout,
+            output_format=args.output_format
+        )
+        for result in results:
+            if result['error']:
+                print(f"✗ {result['url']}: {result['error']}")
+        if any(result['error'] for result in results):
+            raise SystemExit(1)
+        return
+
+    if args.all_styles or args.all_layouts:
+        variants = generator.generate_post_variants(
+            args.url,
+            styles=None if args.all_styles else [args.style],
+            layouts=None if args.all_layouts else [args.layout],
+            brand_text=args.brand_text,
+            show_source=show_source_override,
+            output_format=args.output_format
+        )
+        print(f"\n✓ Successfully generated {len(variants)} posts:")
+        for variant in variants:
+            print(f"  [{variant['style']}/{variant['layout']}] {variant['output_path']}")
+        return
+
+    trace = Trace()
     output_path = generator.generate_post(
         args.url,
         output_filename=args.output_filename,
         brand_text=args.brand_text,
         style=args.style,
         show_source=show_source_override,
-        layout=args.layout
+        layout=args.layout,
+        output_format=args.output_format,
+        trace=trace
     )
 
     print(f"\n✓ Successfully generated post: {output_path}")
+    print(f"Timings: {trace.summary()}")
 
 
 if __name__ == "__main__":
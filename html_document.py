@@ -0,0 +1,229 @@
+"""
+Headline AI - Parsed article HTML
+
+Each article page is parsed once into an ArticleDocument, which is then shared
+by image extraction, metadata extraction and content distillation.
+"""
+
+import re
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+import config
+
+# Tags that never contain article text (<header> is kept, articles often put the title there)
+BOILERPLATE_TAGS = {
+    'script', 'style', 'noscript', 'template', 'svg', 'iframe', 'form',
+    'nav', 'footer', 'aside', 'button', 'select',
+}
+
+# class/id fragments of boilerplate containers (menus, share bars, related links, ads)
+BOILERPLATE_PATTERN = re.compile(
+    r'(^|[-_ ])(nav|menu|footer|header|sidebar|share|social|related|recommend|comment|'
+    r'advert|ads?|promo|newsletter|subscribe|breadcrumb|cookie|popup|banner)([-_ ]|$)',
+    re.IGNORECASE
+)
+
+# Candidate containers for the main article body, in priority order
+MAIN_CONTENT_SELECTORS = [
+    '[itemprop="articleBody"]', 'article', '.article-content', '.post-content',
+    '.entry-content', '.article', '.content', 'main',
+]
+
+# Block tags whose text makes up the article body
+TEXT_BLOCK_TAGS = ['h1', 'h2', 'h3', 'p', 'li', 'blockquote']
+
+
+def resolve_parser(parser=None):
+    """Return the BeautifulSoup parser backend to use
+
+    Falls back to the built-in html.parser when lxml is not installed.
+    """
+    parser = parser or config.HTML_PARSER
+    if parser == 'lxml':
+        try:
+            import lxml  # noqa: F401
+        except ImportError:
+            return 'html.parser'
+    return parser
+
+
+class ArticleDocument:
+    def __init__(self, html_content, url, parser=None, options=None):
+        """Parse article HTML once
+
+        Args:
+            html_content: HTML content of the article
+            url: Article URL, used to resolve relative links
+            parser: BeautifulSoup parser backend (default: HTML_PARSER)
+            options: Options for this job (default: config)
+        """
+        self.html = html_content
+        self.url = url
+        self.options = options or config
+        self.soup = BeautifulSoup(html_content, resolve_parser(parser or self.options.HTML_PARSER))
+        self._image_candidates = None
+        self._metadata = None
+        self._distilled = {}
+
+    def _meta_content(self, *selectors):
+        """Return content of the first matching <meta> tag"""
+        for attr, value in selectors:
+            tag = self.soup.find('meta', attrs={attr: value})
+            if tag and tag.get('content'):
+                return tag['content'].strip()
+        return None
+
+    def image_candidates(self):
+        """Extract all possible images, ordered by priority"""
+        if self._image_candidates is not None:
+            return self._image_candidates
+
+        soup = self.soup
+        image_urls = []
+
+        # Priority 1: Open Graph image
+        og_image = soup.find('meta', property='og:image')
+        if og_image and og_image.get('content'):
+            image_urls.append(og_image['content'])
+
+        # Priority 2: Twitter card image
+        twitter_image = soup.find('meta', attrs={'name': 'twitter:image'})
+        if twitter_image and twitter_image.get('content'):
+            image_urls.append(twitter_image['content'])
+
+        # Priority 3: Article images
+        article_imgs = soup.select('article img, .article img, .content img, .post-content img')
+        for img in article_imgs[:self.options.MAX_ARTICLE_IMAGES]:
+            if img.get('src'):
+                image_urls.append(img['src'])
+            elif img.get('data-src'):  # Lazy loaded images
+                image_urls.append(img['data-src'])
+
+        # Priority 4: All images with reasonable size attributes
+        all_imgs = soup.find_all('img', limit=self.options.MAX_GENERAL_IMAGES)
+        for img in all_imgs:
+            if img.get('src'):
+                # Skip small images (icons, logos, etc)
+                width = img.get('width', '0')
+                height = img.get('height', '0')
+                try:
+                    if width and height:
+                        if int(width) > 200 and int(height) > 200:
+                            image_urls.append(img['src'])
+                    else:
+                        image_urls.append(img['src'])
+                except:
+                    image_urls.append(img['src'])
+
+        # Make URLs absolute
+        absolute_urls = []
+        for url in image_urls:
+            if url.startswith('http'):
+                absolute_urls.append(url)
+            else:
+                absolute_urls.append(urljoin(self.url, url))
+
+        # Remove duplicates while preserving order
+        self._image_candidates = list(dict.fromkeys(absolute_urls))
+        return self._image_candidates
+
+    def metadata(self):
+        """Extract title, description, site name, author and publish date"""
+        if self._metadata is not None:
+            return self._metadata
+
+        title = self._meta_content(('property', 'og:title'), ('name', 'twitter:title'))
+        if not title and self.soup.title and self.soup.title.string:
+            title = self.soup.title.string.strip()
+
+        self._metadata = {
+            'title': title,
+            'description': self._meta_content(
+                ('property', 'og:description'), ('name', 'description'), ('name', 'twitter:description')
+            ),
+            'site_name': self._meta_content(('property', 'og:site_name'), ('name', 'application-name')),
+            'author': self._meta_content(('name', 'author'), ('property', 'article:author')),
+            'published': self._meta_content(
+                ('property', 'article:published_time'), ('name', 'pubdate'), ('name', 'publishdate')
+            ),
+        }
+        return self._metadata
+
+    def _is_boilerplate(self, tag, root=None):
+        """Check if tag sits inside a script, nav, footer, share bar, etc
+
+        Only nodes below root are checked, so page-level classes on <body>
+        (e.g. "has-sidebar") do not hide the whole article.
+        """
+        node = tag
+        while node is not None and node is not root:
+            if node.name in BOILERPLATE_TAGS:
+                return True
+            attrs = getattr(node, 'attrs', None) or {}
+            names = ' '.join(attrs.get('class', [])) + ' ' + (attrs.get('id') or '')
+            if names.strip() and BOILERPLATE_PATTERN.search(names):
+                return True
+            if node.name in ('body', 'html'):
+                break
+            node = node.parent
+        return False
+
+    def main_content_root(self):
+        """Return the node most likely holding the article body"""
+        for selector in MAIN_CONTENT_SELECTORS:
+            for node in self.soup.select(selector):
+                if node.find_parent(BOILERPLATE_TAGS) is None and node.find('p'):
+                    return node
+        return self.soup.body or self.soup
+
+    def main_text_blocks(self):
+        """Return article body text blocks with boilerplate removed
+
+        The parsed tree is not modified, so the document stays safe to share.
+        """
+        root = self.main_content_root()
+        blocks = []
+        seen = set()
+        for tag in root.find_all(TEXT_BLOCK_TAGS):
+            # Skip blocks nested in another text block (li > p), the parent covers them
+            if tag.find_parent(TEXT_BLOCK_TAGS) is not None:
+                continue
+            if self._is_boilerplate(tag, root):
+                continue
+            text = ' '.join(tag.get_text(' ', strip=True).split())
+            if not text or text in seen:
+                continue
+            # Headings are short by nature, only filter short paragraphs/list items
+            if not tag.name.startswith('h') and len(text) < self.options.DISTILL_MIN_BLOCK_LENGTH:
+                continue
+            seen.add(text)
+            blocks.append(text)
+        return blocks
+
+    def distill(self, max_tokens=None):
+        """Distill the page into title, metadata and main article text
+
+        The result fits within max_tokens (estimated as DISTILL_CHARS_PER_TOKEN
+        characters per token), cut at a word boundary.
+        """
+        max_tokens = max_tokens or self.options.MAX_CONTENT_TOKENS
+        if max_tokens in self._distilled:
+            return self._distilled[max_tokens]
+
+        metadata = self.metadata()
+        header = []
+        for label, key in (('Title', 'title'), ('Site', 'site_name'), ('Author', 'author'),
+                           ('Published', 'published'), ('Description', 'description')):
+            if metadata[key]:
+                header.append(f"{label}: {metadata[key]}")
+
+        content = '\n'.join(header) + '\n\n' + '\n\n'.join(self.main_text_blocks())
+
+        max_chars = max_tokens * self.options.DISTILL_CHARS_PER_TOKEN
+        if len(content) > max_chars:
+            content = content[:max_chars].rsplit(' ', 1)[0] + "..."
+
+        self._distilled[max_tokens] = content.strip()
+        return self._distilled[max_tokens]
@@ -0,0 +1,120 @@
+"""
+Headline AI - Background image cache
+
+Downloaded background images are stored once per content hash in a
+DiskCache. A per-URL entry holds the hash, the image size and the
+ETag/Last-Modified validators, so many URLs serving the same photo share one
+copy, and images rejected as too small are remembered without their bytes.
+
+Decoded, cover-resized frames are kept in an in-memory LRU with a byte
+budget, keyed by content hash and target size, so restyling or re-rendering a
+story neither downloads nor decodes its image again.
+"""
+
+import hashlib
+import json
+from io import BytesIO
+
+from PIL import Image
+
+from cache import DiskCache, LRUCache, make_key
+
+
+def frame_size(img):
+    """Approximate memory used by a decoded image in bytes"""
+    return img.width * img.height * len(img.getbands())
+
+
+class ImageCache:
+    def __init__(self, path, ttl=None, max_bytes=None, frame_bytes=None, frame_entries=64):
+        """Background images on disk, cover-resized frames in memory
+
+        Args:
+            path: SQLite database file
+            ttl: Seconds an image is kept for revalidation (None = until evicted)
+            max_bytes: Disk budget, least recently used images evicted first
+            frame_bytes: Memory budget for decoded frames
+            frame_entries: Maximum number of decoded frames
+        """
+        self.disk = DiskCache(path, ttl=ttl, max_bytes=max_bytes)
+        self.frames = LRUCache(max_entries=frame_entries, max_bytes=frame_bytes, sizeof=frame_size)
+
+    def _url_key(self, url):
+        return make_key('image-url', url)
+
+    def _blob_key(self, content_hash):
+        return make_key('image-blob', content_hash)
+
+    def get(self, url, max_age=None):
+        """URL entry {hash, width, height, etag, last_modified}, None if missing or older than max_age
+
+        hash is None for images that were rejected as too small.
+        """
+        raw = self.disk.get(self._url_key(url), max_age=max_age)
+        return json.loads(raw) if raw is not None else None
+
+    def put(self, url, data, width, height, etag=None, last_modified=None):
+        """Store an image for url (data None to only remember its size), returns the entry"""
+        content_hash = None
+        if data is not None:
+            content_hash = hashlib.sha256(data).hexdigest()
+            self.disk.put(self._blob_key(content_hash), data)
+
+        entry = {
+            'hash': content_hash,
+            'width': width,
+            'height': height,
+            'etag': etag,
+            'last_modified': last_modified,
+        }
+        self.disk.put(self._url_key(url), json.dumps(entry))
+        return entry
+
+    def touch(self, url, entry):
+        """Mark url and its image fresh again after the server answered 304 Not Modified"""
+        self.disk.touch(self._url_key(url))
+        if entry['hash']:
+            self.disk.touch(self._blob_key(entry['hash']))
+
+    def open(self, entry):
+        """Lazily opened image of an entry, None if its bytes are not on disk (anymore)"""
+        if not entry['hash']:
+            return None
+        data = self.disk.get(self._blob_key(entry['hash']))
+        if data is None:
+            return None
+        img = Image.open(BytesIO(data))
+        img.info['content_hash'] = entry['hash']
+        return img
+
+    def conditional_headers(self, entry):
+        """If-None-Match/If-Modified-Since headers for revalidating entry"""
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def frame_key(self, img, target_size, options):
+        """Key of the cover-resized frame of img, None for images not from the cache"""
+        content_hash = img.info.get('content_hash')
+        if content_hash is None:
+            return None
+        return make_key(content_hash, target_size, options.FAST_DECODE, options.RESIZE_REDUCING_GAP)
+
+    def get_frame(self, key):
+        return self.frames.get(key)
+
+    def put_frame(self, key, frame):
+        self.frames.put(key, frame)
+
+    def stats(self):
+        return {
+            'frames': len(self.frames),
+            'frame_bytes': self.frames.size_bytes,
+            **{f'disk_{k}': v for k, v in self.disk.stats().items()},
+        }
+
+    def close(self):
+        self.disk.close()
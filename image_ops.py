@@ -0,0 +1,60 @@
+"""
+Headline AI - Background image operations
+
+Large press photos are decoded at reduced resolution (JPEG DCT scaling via
+Image.draft) close to the cover size, then shrunk with a cheap integer reduce,
+so the LANCZOS filter only runs on the final small step.
+"""
+
+from PIL import Image
+
+import config
+
+
+def cover_size(image_size, target_size):
+    """Size to scale image_size to so it covers target_size, keeping aspect ratio"""
+    img_ratio = image_size[0] / image_size[1]
+    target_ratio = target_size[0] / target_size[1]
+
+    if img_ratio > target_ratio:
+        # Image is wider, fit by height
+        new_height = target_size[1]
+        new_width = int(new_height * img_ratio)
+    else:
+        # Image is taller, fit by width
+        new_width = target_size[0]
+        new_height = int(new_width / img_ratio)
+
+    return new_width, new_height
+
+
+def decode_for_cover(img, target_size, options=None):
+    """Decode a lazily opened image at the smallest resolution still covering target_size
+
+    Only JPEG supports reduced decoding; other formats and already decoded
+    images are loaded as they are. Returns the decoded image.
+    """
+    options = options or config
+    if options.FAST_DECODE:
+        img.draft(None, cover_size(img.size, target_size))
+    img.load()
+    return img
+
+
+def cover_resize(img, target_size, options=None):
+    """Resize and center-crop image to fill target_size"""
+    options = options or config
+    img = decode_for_cover(img, target_size, options)
+    new_width, new_height = cover_size(img.size, target_size)
+
+    # reducing_gap: integer box reduce first, LANCZOS only for the remaining step
+    img = img.resize(
+        (new_width, new_height),
+        Image.Resampling.LANCZOS,
+        reducing_gap=options.RESIZE_REDUCING_GAP
+    )
+
+    # Crop to center
+    left = (new_width - target_size[0]) // 2
+    top = (new_height - target_size[1]) // 2
+    return img.crop((left, top, left + target_size[0], top + target_size[1]))
@@ -0,0 +1,159 @@
+"""
+Headline AI - Background generation jobs
+
+The web app submits generation work as jobs that run on a bounded worker pool.
+Each job reports per-stage progress, and submissions are rejected with
+JobQueueFull once too many jobs are queued or running.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+
+# Generation stages reported by HeadlineGenerator.generate_post, in order
+STAGES = [
+    ('fetch', 'Downloading HTML content'),
+    ('analyze', 'Analyzing content with Gemini AI'),
+    ('image', 'Finding article images'),
+    ('render', 'Generating post design'),
+]
+
+
+class JobQueueFull(Exception):
+    """Raised when the job queue is at capacity"""
+
+
+class Job:
+    def __init__(self, params=None):
+        self.id = uuid.uuid4().hex
+        self.params = params or {}
+        self.status = 'queued'
+        self.stage = None
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self._done = threading.Event()
+
+    def update_stage(self, stage):
+        """Progress callback: stage becomes current, earlier stages count as complete"""
+        self.stage = stage
+
+    def wait(self, timeout=None):
+        """Block until the job is done or failed, returns True if finished"""
+        return self._done.wait(timeout)
+
+    def _stage_statuses(self):
+        keys = [key for key, _ in STAGES]
+        current = keys.index(self.stage) if self.stage in keys else -1
+
+        stages = []
+        for i, (key, label) in enumerate(STAGES):
+            if self.status == 'done' or i < current:
+                status = 'complete'
+            elif i == current:
+                status = 'error' if self.status == 'failed' else 'running'
+            else:
+                status = 'pending'
+            stages.append({'key': key, 'label': label, 'status': status})
+        return stages
+
+    def to_dict(self):
+        stages = self._stage_statuses()
+        completed = sum(1 for stage in stages if stage['status'] == 'complete')
+
+        if self.status == 'queued':
+            message = 'Waiting in queue...'
+        elif self.status == 'running':
+            message = next((s['label'] for s in stages if s['status'] == 'running'), 'Starting...')
+        elif self.status == 'done':
+            message = 'Complete!'
+        else:
+            message = 'Failed'
+
+        return {
+            'id': self.id,
+            'status': self.status,
+            'message': message,
+            'progress': int(completed * 100 / len(STAGES)),
+            'stages': stages,
+            'params': self.params,
+            'result': self.result,
+            'error': self.error,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+        }
+
+
+class JobManager:
+    def __init__(self, workers=None, max_pending=None, history=None):
+        """Run jobs on a bounded worker pool
+
+        Args:
+            workers: Jobs running at the same time
+            max_pending: Max queued + running jobs before JobQueueFull is raised
+            history: Finished jobs kept for status lookups
+        """
+        self.workers = workers or config.JOB_WORKERS
+        self.max_pending = max_pending or config.JOB_MAX_PENDING
+        self.history = history or config.JOB_HISTORY
+        self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix='job')
+        self._jobs = OrderedDict()
+        self._active = 0
+        self._lock = threading.Lock()
+
+    def submit(self, fn, **params):
+        """Queue fn(progress) as a job, its return value becomes the job result"""
+        with self._lock:
+            if self._active >= self.max_pending:
+                raise JobQueueFull(f"{self._active} jobs pending, try again later")
+            job = Job(params)
+            self._jobs[job.id] = job
+            self._active += 1
+            self._prune()
+
+        self._pool.submit(self._run, job, fn)
+        return job
+
+    def _run(self, job, fn):
+        job.status = 'running'
+        job.started = time.time()
+        try:
+            job.result = fn(job.update_stage)
+            job.status = 'done'
+        except Exception as e:
+            job.error = str(e)
+            job.status = 'failed'
+        finally:
+            job.finished = time.time()
+            with self._lock:
+                self._active -= 1
+            job._done.set()
+
+    def _prune(self):
+        """Drop oldest finished jobs beyond the history limit"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished is not None]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def stats(self):
+        with self._lock:
+            running = sum(1 for job in self._jobs.values() if job.status == 'running')
+            return {
+                'workers': self.workers,
+                'max_pending': self.max_pending,
+                'running': running,
+                'queued': self._active - running,
+            }
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,185 @@
+"""
+Headline AI - Batched Gemini requests for batch mode
+
+Instead of one chat completion per article, articles waiting for Gemini are
+grouped by headline style and sent together: the style instructions once,
+followed by every article, answered with a JSON array holding one headline
+per article id. A group is sent when LLM_BATCH_SIZE articles are waiting or
+the oldest one has waited LLM_BATCH_MAX_WAIT seconds. Articles missing from
+the answer (or all of them, when the request fails) are retried one by one
+with the normal single-article prompt.
+"""
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import nullcontext
+
+import config
+from cache import make_key
+from metrics import Trace, current_trace
+
+# Stand-ins for the per-article fields of a style prompt, the articles follow the instructions
+ARTICLE_PLACEHOLDERS = {'url': '(lihat URL di daftar artikel)', 'html_content': '(lihat daftar artikel)'}
+
+
+class BatchItem:
+    def __init__(self, document, url, style, content, temperature, cache_key, options, trace):
+        self.document = document
+        self.url = url
+        self.style = style
+        self.content = content
+        self.temperature = temperature
+        self.cache_key = cache_key
+        self.options = options
+        self.trace = trace
+        self.future = Future()
+
+
+class LLMBatcher:
+    def __init__(self, generator, batch_size=None, max_wait=None, workers=None):
+        """Group Gemini requests of many articles into fewer calls
+
+        Args:
+            generator: HeadlineGenerator used for prompts, cache and API calls
+            batch_size: Max articles per request (default: LLM_BATCH_SIZE)
+            max_wait: Seconds the first article of a group waits for more (default: LLM_BATCH_MAX_WAIT)
+            workers: Requests in flight at the same time (default: BATCH_LLM_WORKERS)
+        """
+        self.generator = generator
+        self.batch_size = batch_size or config.LLM_BATCH_SIZE
+        self.max_wait = max_wait if max_wait is not None else config.LLM_BATCH_MAX_WAIT
+        self.pool = ThreadPoolExecutor(workers or config.BATCH_LLM_WORKERS, thread_name_prefix='llm-batch')
+
+        self._groups = {}  # group key -> (deadline, [BatchItem])
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._dispatch_loop, name='llm-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, document, url, style, options=None, trace=None):
+        """Queue one article, returns a Future of its article data (see extract_content_with_gemini)
+
+        Args:
+            trace: metrics.Trace of the article (default: the current trace)
+        """
+        options = options or self.generator.options
+        trace = trace or current_trace()
+
+        with trace.activate() if trace is not None else nullcontext():
+            style, content, temperature, cache_key = self.generator.style_request(document, url, style, options)
+            cached = self.generator.cached_style_result(cache_key, document)
+
+        item = BatchItem(document, url, style, content, temperature, cache_key, options, trace)
+        if cached is not None:
+            item.future.set_result(cached)
+            return item.future
+
+        # Articles share a request when everything in the prompt except the articles is the same
+        group = make_key(style, options.HEADLINE_STYLES[style]['prompt'], options.MULTI_ARTICLE_PROMPT_TEMPLATE,
+                         options.MAX_TITLE_LENGTH, options.GEMINI_MODEL, temperature)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("LLMBatcher is closed")
+            deadline, items = self._groups.setdefault(group, (time.monotonic() + self.max_wait, []))
+            items.append(item)
+            # Wake the dispatcher for a full group, or to schedule the deadline of a new one
+            if len(items) == 1 or len(items) >= self.batch_size:
+                self._cond.notify()
+        return item.future
+
+    def _dispatch_loop(self):
+        """Send groups that are full or waited long enough"""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                for group, (deadline, items) in list(self._groups.items()):
+                    if len(items) >= self.batch_size or deadline <= now or self._closed:
+                        del self._groups[group]
+                        for i in range(0, len(items), self.batch_size):
+                            self.pool.submit(self._send, items[i:i + self.batch_size])
+
+                if self._closed and not self._groups:
+                    return
+                if self._groups:
+                    self._cond.wait(min(deadline for deadline, _ in self._groups.values()) - now)
+                else:
+                    self._cond.wait()
+
+    def _send(self, items):
+        if len(items) > 1:
+            try:
+                self._send_batch(items)
+            except Exception as e:
+                print(f"Batched Gemini request failed: {e}")
+
+        # Lone articles, and articles the batch gave no usable answer for
+        for item in items:
+            if not item.future.done():
+                if len(items) > 1:
+                    print(f"No usable answer for {item.url} in batch, requesting it separately...")
+                self._send_single(item)
+
+    def _send_batch(self, items):
+        generator = self.generator
+        first = items[0]
+        print(f"Analyzing {len(items)} articles with one Gemini request (Style: {first.style})...")
+
+        instructions = first.options.HEADLINE_STYLES[first.style]['prompt'].format(
+            max_title_length=first.options.MAX_TITLE_LENGTH, **ARTICLE_PLACEHOLDERS
+        )
+        articles = "\n".join(
+            f"=== ARTIKEL id={i} ===\nURL: {item.url}\nHTML: {item.content}\n"
+            for i, item in enumerate(items, 1)
+        )
+        prompt = first.options.MULTI_ARTICLE_PROMPT_TEMPLATE.format(instructions=instructions, articles=articles)
+
+        # The request is traced on its own, so process-wide call and token totals stay exact
+        batch_trace = Trace()
+        try:
+            with batch_trace.activate():
+                result_text = generator.chat_completion(prompt, first.temperature, first.options)
+        finally:
+            self._record(items, batch_trace)
+
+        answers = {}
+        for answer in generator.parse_json_response(result_text).get('articles') or []:
+            if isinstance(answer, dict) and answer.get('title'):
+                answers[str(answer.get('id'))] = answer
+
+        for i, item in enumerate(items, 1):
+            answer = answers.get(str(i))
+            if answer is not None:
+                data = {key: value for key, value in answer.items() if key != 'id'}
+                item.future.set_result(generator.style_result(data, item.document, item.url, item.cache_key))
+
+    def _record(self, items, batch_trace):
+        """Add the request time to every article, its call and token counters to the first one"""
+        for i, item in enumerate(items):
+            if item.trace is None:
+                continue
+            item.trace.add_time('llm', batch_trace.timings.get('llm', 0.0))
+            item.trace.count('llm_batched')
+            if i == 0:
+                for name, value in batch_trace.counters.items():
+                    item.trace.count(name, value)
+
+    def _send_single(self, item):
+        """Normal single-article request, used for lone articles and retries"""
+        try:
+            with item.trace.activate() if item.trace is not None else nullcontext():
+                result = self.generator.extract_content_with_gemini(
+                    item.document.html, item.url, style=item.style, document=item.document, options=item.options
+                )
+            item.future.set_result(result)
+        except Exception as e:
+            item.future.set_exception(e)
+
+    def close(self):
+        """Send everything still waiting, then stop once all requests are done"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        self.pool.shutdown(wait=True)
+
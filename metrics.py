@@ -0,0 +1,170 @@
+"""
+Headline AI - Timing and counters
+
+A Trace collects per-stage durations and counters (bytes fetched, tokens,
+image candidates, cache hits) for one generation job. The active trace is
+held in a context variable, so code deep in the pipeline records into it with
+timed() and count() without passing it around; both are no-ops when no trace
+is active. Finished traces are aggregated by the process-wide registry and
+exposed in Prometheus text format.
+
+Stages: fetch, parse, distill, llm, image_probe, render (includes resize and
+text_layout), encode, index and total.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Histogram buckets in seconds
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_current = ContextVar('headline_trace', default=None)
+
+
+class Trace:
+    def __init__(self):
+        self.timings = {}  # stage -> seconds
+        self.counters = {}  # name -> value
+        self._lock = threading.Lock()
+
+    def add_time(self, stage, seconds):
+        with self._lock:
+            self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    @contextmanager
+    def stage(self, name):
+        """Time the block as stage name, repeated stages add up"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    @contextmanager
+    def activate(self):
+        """Make this the current trace for timed() and count() in this context"""
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'timings_ms': {stage: round(seconds * 1000, 1) for stage, seconds in self.timings.items()},
+                'counters': dict(self.counters),
+            }
+
+    def server_timing(self):
+        """Server-Timing header value, e.g. "fetch;dur=120.5, llm;dur=900.1" """
+        with self._lock:
+            return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in self.timings.items())
+
+    def summary(self):
+        """One line for CLI output"""
+        with self._lock:
+            return ", ".join(f"{stage} {seconds * 1000:.0f}ms" for stage, seconds in self.timings.items())
+
+
+def current_trace():
+    return _current.get()
+
+
+@contextmanager
+def timed(stage):
+    """Time the block into the current trace, if any"""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    with trace.stage(stage):
+        yield
+
+
+def count(name, value=1):
+    """Add to a counter of the current trace, if any"""
+    trace = _current.get()
+    if trace is not None:
+        trace.count(name, value)
+
+
+class Histogram:
+    def __init__(self, buckets=STAGE_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Aggregates finished traces: stage histograms, counter totals, posts by status"""
+
+    def __init__(self, prefix='headline'):
+        self.prefix = prefix
+        self._stages = {}
+        self._counters = {}
+        self._posts = {}
+        self._lock = threading.Lock()
+
+    def observe(self, trace, status='ok'):
+        with trace._lock:
+            timings = dict(trace.timings)
+            counters = dict(trace.counters)
+
+        with self._lock:
+            for stage, seconds in timings.items():
+                self._stages.setdefault(stage, Histogram()).observe(seconds)
+            for name, value in counters.items():
+                self._counters[name] = self._counters.get(name, 0) + value
+            self._posts[status] = self._posts.get(status, 0) + 1
+
+    def render(self, gauges=None):
+        """Prometheus text exposition format
+
+        Args:
+            gauges: Extra {name: value} gauges, e.g. job queue depth
+        """
+        p = self.prefix
+        lines = []
+        with self._lock:
+            lines.append(f"# HELP {p}_stage_seconds Time spent per generation stage")
+            lines.append(f"# TYPE {p}_stage_seconds histogram")
+            for stage, histogram in sorted(self._stages.items()):
+                for bound, bucket_count in zip(histogram.buckets, histogram.counts):
+                    lines.append(f'{p}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {bucket_count}')
+                lines.append(f'{p}_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{p}_stage_seconds_sum{{stage="{stage}"}} {histogram.sum:.6f}')
+                lines.append(f'{p}_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+
+            lines.append(f"# HELP {p}_posts_total Generation jobs by result")
+            lines.append(f"# TYPE {p}_posts_total counter")
+            for status, value in sorted(self._posts.items()):
+                lines.append(f'{p}_posts_total{{status="{status}"}} {value}')
+
+            for name, value in sorted(self._counters.items()):
+                lines.append(f"# TYPE {p}_{name}_total counter")
+                lines.append(f"{p}_{name}_total {value}")
+
+        for name, value in sorted((gauges or {}).items()):
+            lines.append(f"# TYPE {p}_{name} gauge")
+            lines.append(f"{p}_{name} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+# Shared by every HeadlineGenerator in the process
+registry = MetricsRegistry()
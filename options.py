@@ -0,0 +1,61 @@
+"""
+Headline AI - Per-job generation options
+
+Options is a read-only snapshot of the config settings, taken when a job
+starts and passed through fetch, Gemini and render. Jobs never modify the
+config module, so jobs with different settings can run in parallel in one
+process. Options has the same attribute names as config (options.SHOW_SOURCE).
+"""
+
+import runpy
+
+import config
+from cache import make_key
+
+
+def _settings(namespace):
+    """UPPERCASE names of a config namespace"""
+    return {name: value for name, value in namespace.items() if name.isupper()}
+
+
+class Options:
+    __slots__ = ('_values',)
+
+    def __init__(self, values):
+        object.__setattr__(self, '_values', dict(values))
+
+    @classmethod
+    def from_config(cls, **overrides):
+        """Snapshot of the imported config module, with overrides"""
+        values = _settings(vars(config))
+        values.update(overrides)
+        return cls(values)
+
+    @classmethod
+    def from_file(cls, path='config.py', **overrides):
+        """Snapshot of a config file as it is on disk now, without reloading the config module"""
+        values = _settings(runpy.run_path(path))
+        values.update(overrides)
+        return cls(values)
+
+    def replace(self, **overrides):
+        """Copy with some settings changed, None values are ignored"""
+        values = dict(self._values)
+        values.update({name: value for name, value in overrides.items() if value is not None})
+        return Options(values)
+
+    def version(self):
+        """Hash of all settings, changes whenever any setting does"""
+        return make_key(sorted(self._values.items()))
+
+    def __getattr__(self, name):
+        try:
+            return self._values[name]
+        except KeyError:
+            raise AttributeError(f"Unknown setting: {name}") from None
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Options are read-only, use replace()")
+
+    def __repr__(self):
+        return f"Options({len(self._values)} settings)"
@@ -0,0 +1,193 @@
+"""
+Headline AI - Index of generated posts
+
+Every post written to OUTPUT_DIR is recorded in SQLite with its article URL,
+style, layout, title, source, size and timestamps. The gallery reads pages
+from this index with keyset pagination instead of scanning the directory.
+Posts also store the fingerprint of the job that made them, so an identical
+job can return the existing post.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+import config
+
+
+class PostIndex:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS posts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                filename TEXT NOT NULL UNIQUE,
+                url TEXT,
+                style TEXT,
+                layout TEXT,
+                title TEXT,
+                source TEXT,
+                size INTEGER NOT NULL DEFAULT 0,
+                thumbnail TEXT,
+                created REAL NOT NULL,
+                updated REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS posts_updated ON posts (updated DESC, id DESC);
+            CREATE INDEX IF NOT EXISTS posts_style ON posts (style, updated DESC, id DESC);
+            CREATE INDEX IF NOT EXISTS posts_layout ON posts (layout, updated DESC, id DESC);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        ''')
+        # Indexes created before thumbnails were added
+        columns = [row['name'] for row in self._conn.execute('PRAGMA table_info(posts)')]
+        if 'thumbnail' not in columns:
+            self._conn.execute('ALTER TABLE posts ADD COLUMN thumbnail TEXT')
+        if 'fingerprint' not in columns:
+            self._conn.execute('ALTER TABLE posts ADD COLUMN fingerprint TEXT')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS posts_fingerprint ON posts (fingerprint, updated DESC)')
+        self._conn.commit()
+
+    def record(self, output_path, url=None, style=None, layout=None, title=None, source=None, thumbnail=None,
+               fingerprint=None):
+        """Add or update a post after its file has been written"""
+        filename = os.path.basename(output_path)
+        size = os.path.getsize(output_path) if os.path.exists(output_path) else 0
+        now = time.time()
+
+        with self._lock:
+            # Regenerating the same filename overwrites the file, keep one row
+            self._conn.execute(
+                'INSERT INTO posts (filename, url, style, layout, title, source, size, thumbnail, fingerprint,'
+                ' created, updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'
+                ' ON CONFLICT(filename) DO UPDATE SET url = excluded.url, style = excluded.style,'
+                ' layout = excluded.layout, title = excluded.title, source = excluded.source,'
+                ' size = excluded.size, thumbnail = excluded.thumbnail, fingerprint = excluded.fingerprint,'
+                ' updated = excluded.updated',
+                (filename, url, style, layout, title, source, size, thumbnail, fingerprint, now, now)
+            )
+            self._conn.commit()
+
+    def set_thumbnail(self, filename, thumbnail):
+        with self._lock:
+            self._conn.execute('UPDATE posts SET thumbnail = ? WHERE filename = ?', (thumbnail, filename))
+            self._conn.commit()
+
+    def remove(self, filename):
+        with self._lock:
+            self._conn.execute('DELETE FROM posts WHERE filename = ?', (filename,))
+            self._conn.commit()
+
+    def get(self, filename):
+        with self._lock:
+            row = self._conn.execute('SELECT * FROM posts WHERE filename = ?', (filename,)).fetchone()
+        return dict(row) if row else None
+
+    def find(self, fingerprint, max_age=None):
+        """Newest post made by the job with this fingerprint, None if none (or older than max_age seconds)"""
+        sql = 'SELECT * FROM posts WHERE fingerprint = ?'
+        params = [fingerprint]
+        if max_age:
+            sql += ' AND updated >= ?'
+            params.append(time.time() - max_age)
+        sql += ' ORDER BY updated DESC LIMIT 1'
+
+        with self._lock:
+            row = self._conn.execute(sql, params).fetchone()
+        return dict(row) if row else None
+
+    def page(self, limit=None, cursor=None, style=None, layout=None, query=None):
+        """Return one page of posts, newest first
+
+        Args:
+            limit: Posts per page (default: GALLERY_PAGE_SIZE)
+            cursor: Opaque "updated:id" cursor from a previous page
+            style, layout: Exact match filters
+            query: Substring filter on title, source and URL
+
+        Returns:
+            (posts, next_cursor) where next_cursor is None on the last page
+        """
+        limit = limit or config.GALLERY_PAGE_SIZE
+        where = []
+        params = []
+
+        if style:
+            where.append('style = ?')
+            params.append(style)
+        if layout:
+            where.append('layout = ?')
+            params.append(layout)
+        if query:
+            where.append('(title LIKE ? OR source LIKE ? OR url LIKE ?)')
+            params.extend([f'%{query}%'] * 3)
+        if cursor:
+            try:
+                updated, post_id = cursor.split(':')
+                where.append('(updated, id) < (?, ?)')
+                params.extend([float(updated), int(post_id)])
+            except ValueError:
+                pass
+
+        sql = 'SELECT * FROM posts'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY updated DESC, id DESC LIMIT ?'
+        params.append(limit + 1)
+
+        with self._lock:
+            rows = [dict(row) for row in self._conn.execute(sql, params)]
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = f"{last['updated']!r}:{last['id']}"
+        return rows, next_cursor
+
+    def backfill(self, output_dir):
+        """Import posts already in output_dir once, for posts created before the index existed"""
+        with self._lock:
+            done = self._conn.execute("SELECT value FROM meta WHERE key = 'backfilled'").fetchone()
+        if done or not os.path.exists(output_dir):
+            return 0
+
+        imported = 0
+        with self._lock:
+            for entry in os.scandir(output_dir):
+                if not entry.is_file() or not entry.name.endswith(('.png', '.jpg', '.jpeg', '.webp')):
+                    continue
+                stat = entry.stat()
+                cursor = self._conn.execute(
+                    'INSERT OR IGNORE INTO posts (filename, size, created, updated) VALUES (?, ?, ?, ?)',
+                    (entry.name, stat.st_size, stat.st_mtime, stat.st_mtime)
+                )
+                imported += cursor.rowcount
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('backfilled', '1')")
+            self._conn.commit()
+        return imported
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_post_index(path=None):
+    """Return the process-wide PostIndex for path (default: POST_INDEX_PATH)"""
+    path = path or config.POST_INDEX_PATH
+    with _indexes_lock:
+        if path not in _indexes:
+            _indexes[path] = PostIndex(path)
+        return _indexes[path]
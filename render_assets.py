@@ -0,0 +1,45 @@
+"""
+Headline AI - Precomputed render assets
+
+Layers that depend only on config values are built once and cached, so each
+render composites them in a single operation instead of drawing them again.
+Cached images are shared, callers must not modify them.
+"""
+
+from functools import lru_cache
+
+from PIL import Image
+
+import config
+
+
+@lru_cache(maxsize=8)
+def get_gradient_layer(width, gradient_height, color, curve=0.7):
+    """Bottom gradient for Layout 2, transparent at the top to color alpha at the bottom
+
+    Row i has alpha int((i / gradient_height) ** curve * color alpha). The alpha
+    column is built once and stretched to full width.
+    """
+    alphas = bytes(
+        int(((i / gradient_height) ** curve) * color[3])
+        for i in range(gradient_height)
+    )
+    mask = Image.frombytes('L', (1, gradient_height), alphas).resize(
+        (width, gradient_height), Image.Resampling.NEAREST
+    )
+
+    layer = Image.new('RGBA', (width, gradient_height), color[:3] + (0,))
+    layer.putalpha(mask)
+    return layer
+
+
+@lru_cache(maxsize=8)
+def get_solid_overlay(size, color):
+    """Full-canvas semi-transparent overlay for Layout 1"""
+    return Image.new('RGBA', size, color)
+
+
+def preload():
+    """Build the assets for the current config ahead of the first render"""
+    get_gradient_layer(config.IMAGE_WIDTH, config.LAYOUT2_GRADIENT_HEIGHT, config.LAYOUT2_GRADIENT_COLOR)
+    get_solid_overlay((config.IMAGE_WIDTH, config.IMAGE_HEIGHT), config.OVERLAY_COLOR)
@@ -0,0 +1,116 @@
+"""
+Headline AI - Text layout
+
+Word widths are measured once per font with font.getlength (advance widths, no
+temporary images) and line widths are the sum of word and space advances.
+Word widths are cached per (font, word) and wrapped results per
+(text, font, max_width), both in bounded LRU caches.
+"""
+
+from cache import LRUCache
+from fonts import get_font
+
+import config
+
+
+class TextLayout:
+    def __init__(self, max_cached_layouts=1024, max_cached_widths=16384):
+        self._widths = LRUCache(max_entries=max_cached_widths)  # (font, word) -> advance width
+        self._layouts = LRUCache(max_entries=max_cached_layouts)
+
+    def measure(self, word, font):
+        """Advance width of a word, memoized per font"""
+        key = (font, word)
+        width = self._widths.get(key)
+        if width is None:
+            width = font.getlength(word)
+            self._widths.put(key, width)
+        return width
+
+    def _wrap_widths(self, words, word_widths, space_width, max_width):
+        """Greedy wrap using precomputed widths, returns list of word index ranges"""
+        lines = []
+        line_start = 0
+        line_width = 0.0
+
+        for i, width in enumerate(word_widths):
+            if i == line_start:
+                line_width = width
+                continue
+
+            if line_width + space_width + width > max_width:
+                lines.append((line_start, i))
+                line_start = i
+                line_width = width
+            else:
+                line_width += space_width + width
+
+        if words:
+            lines.append((line_start, len(words)))
+        return lines
+
+    def wrap(self, text, font, max_width):
+        """Wrap text to fit within max_width
+
+        A single word wider than max_width gets its own line.
+        """
+        key = (text, font, max_width)
+        lines = self._layouts.get(key)
+        if lines is not None:
+            return list(lines)
+
+        words = text.split()
+        word_widths = [self.measure(word, font) for word in words]
+        space_width = self.measure(' ', font)
+        ranges = self._wrap_widths(words, word_widths, space_width, max_width)
+        lines = tuple(' '.join(words[start:end]) for start, end in ranges)
+
+        self._layouts.put(key, lines)
+        return list(lines)
+
+    def fit(self, text, font_path, max_size, max_width, max_lines, min_size, step=None):
+        """Pick the largest font size (down to min_size) that wraps text into max_lines
+
+        Words are measured once at max_size, widths at smaller sizes are estimated
+        by scaling, and only the chosen size is measured for real.
+
+        Args:
+            step: Font size decrement per try (default: TITLE_FONT_SIZE_STEP)
+
+        Returns:
+            (font, lines)
+        """
+        step = step or config.TITLE_FONT_SIZE_STEP
+        base_font = get_font(font_path, max_size)
+        words = text.split()
+        base_widths = [self.measure(word, base_font) for word in words]
+        base_space = self.measure(' ', base_font)
+
+        size = max_size
+        while size > min_size:
+            scale = size / max_size
+            ranges = self._wrap_widths(
+                words, [w * scale for w in base_widths], base_space * scale, max_width
+            )
+            if len(ranges) <= max_lines:
+                # Confirm with real measurement, hinting can differ slightly from the estimate
+                font = get_font(font_path, size)
+                lines = self.wrap(text, font, max_width)
+                if len(lines) <= max_lines:
+                    return font, lines
+            size -= step
+
+        font = get_font(font_path, min_size)
+        return font, self.wrap(text, font, max_width)
+
+
+# Shared by every HeadlineGenerator in the process
+text_layout = TextLayout()
+
+
+def wrap_text(text, font, max_width):
+    return text_layout.wrap(text, font, max_width)
+
+
+def fit_text(text, font_path, max_size, max_width, max_lines, min_size, step=None):
+    return text_layout.fit(text, font_path, max_size, max_width, max_lines, min_size, step)
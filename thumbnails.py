@@ -0,0 +1,62 @@
+"""
+Headline AI - Thumbnail derivatives
+
+Small WebP previews of generated posts for the gallery and API responses.
+Thumbnail names contain a hash of the post file, so a regenerated post gets a
+new URL and served thumbnails can be cached forever.
+"""
+
+import hashlib
+import os
+import uuid
+
+from PIL import Image
+
+import config
+
+
+def thumbnail_name(output_path):
+    """Content-hash name for the thumbnail of output_path"""
+    digest = hashlib.sha256()
+    with open(output_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+
+    stem = os.path.splitext(os.path.basename(output_path))[0]
+    ext = config.THUMBNAIL_FORMAT.lower()
+    return f"{stem}.{digest.hexdigest()[:16]}.{ext}"
+
+
+def thumbnail_path(name):
+    return os.path.join(config.THUMBNAIL_DIR, name)
+
+
+def create_thumbnail(output_path):
+    """Write the thumbnail for output_path if it does not exist yet, returns its name"""
+    name = thumbnail_name(output_path)
+    path = thumbnail_path(name)
+    if os.path.exists(path):
+        return name
+
+    os.makedirs(config.THUMBNAIL_DIR, exist_ok=True)
+    with Image.open(output_path) as img:
+        thumb = img.convert('RGB')
+        thumb.thumbnail(
+            (config.THUMBNAIL_SIZE, config.THUMBNAIL_SIZE),
+            Image.Resampling.LANCZOS,
+            reducing_gap=config.RESIZE_REDUCING_GAP
+        )
+
+    # Write under a temporary name so a concurrent request never serves a partial file
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    thumb.save(tmp_path, config.THUMBNAIL_FORMAT, quality=config.THUMBNAIL_QUALITY)
+    os.replace(tmp_path, path)
+    return name
+
+
+def remove_thumbnail(name):
+    if not name:
+        return
+    path = thumbnail_path(name)
+    if os.path.exists(path):
+        os.remove(path)